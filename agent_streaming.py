@@ -0,0 +1,65 @@
+# agent_streaming.py
+
+import contextvars
+import queue
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+_DONE = object()
+
+
+class QueueCallbackHandler(BaseCallbackHandler):
+    """Forwards LLM tokens and tool activity from an agent run into a queue as events."""
+
+    def __init__(self, events: queue.Queue):
+        self.events = events
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        # Tool-calling turns stream empty content; only real text is worth sending.
+        if token:
+            self.events.put({"type": "token", "text": token})
+
+    def on_tool_start(self, serialized: dict, input_str: str, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name", "tool")
+        self.events.put({"type": "step", "tool": name, "input": input_str})
+
+    def on_tool_end(self, output, **kwargs):
+        self.events.put({"type": "step_end", "tool": kwargs.get("name", "tool")})
+
+
+def stream_executor(executor, inputs: dict, callbacks: list = None):
+    """Runs ``executor.invoke(inputs)`` on a worker thread and yields its events as they happen.
+
+    Yields ``token`` events (answer text), ``step``/``step_end`` events (tool
+    calls) and finally ``{"type": "output", "output": <executor output>}``.
+    Tokens seen before a ``step`` event belong to an intermediate LLM turn, so
+    consumers rendering the final answer should reset their buffer on ``step``.
+    Exceptions raised by the run are re-raised in the consumer. ``callbacks``
+    are attached to the run alongside the event handler.
+    """
+    events = queue.Queue()
+    handler = QueueCallbackHandler(events)
+
+    def run():
+        try:
+            output = executor.invoke(inputs, config={"callbacks": [handler, *(callbacks or [])]})
+            events.put({"type": "output", "output": output})
+        except BaseException as e:
+            events.put({"type": "error", "error": e})
+        finally:
+            events.put(_DONE)
+
+    # Carry context variables (e.g. tracing state) over to the worker thread.
+    context = contextvars.copy_context()
+    worker = threading.Thread(target=context.run, args=(run,), name="agent-stream", daemon=True)
+    worker.start()
+
+    while True:
+        event = events.get()
+        if event is _DONE:
+            break
+        if event["type"] == "error":
+            raise event["error"]
+        yield event
+    worker.join()
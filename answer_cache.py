@@ -0,0 +1,98 @@
+# answer_cache.py
+
+import re
+import threading
+
+import numpy as np
+
+from intent_router import EMPLOYEE_ID_PATTERN, TEAM_PATTERN, THIRD_PARTY_PATTERN
+
+# Questions about the asker's own data or actions must always reach the HRIS tools
+PERSONAL_QUERY_PATTERN = re.compile(
+    r"\b(i|i'm|i've|me|my|mine|myself|balance|remaining|left|submit|apply|book|cancel)\b",
+    re.IGNORECASE,
+)
+
+
+def is_personal_query(query: str) -> bool:
+    """True if the question concerns live HR data (the asker's, a colleague's or a team's) or an action.
+
+    Other people and teams are recognised with the intent router's patterns, so
+    the router and the answer cache agree on what needs the HRIS tools.
+    """
+    return any(
+        pattern.search(query)
+        for pattern in (PERSONAL_QUERY_PATTERN, EMPLOYEE_ID_PATTERN, THIRD_PARTY_PATTERN, TEAM_PATTERN)
+    )
+
+
+class SemanticAnswerCache:
+    """Caches agent answers by query embedding and serves near-duplicate questions.
+
+    Entries are scoped to an index version: once the index is rebuilt, answers
+    grounded in the old documents are dropped. A lookup returns the answer of
+    the most similar cached question if its cosine similarity reaches
+    ``threshold``.
+    """
+
+    def __init__(self, threshold: float = 0.95, maxsize: int = 1000):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._index_version = None
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._answers = []
+        self._lock = threading.Lock()
+
+    def _reset(self, index_version):
+        self._index_version = index_version
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._answers = []
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding, index_version):
+        """Returns a cached answer for a semantically equivalent question, or None."""
+        with self._lock:
+            if index_version != self._index_version:
+                self._reset(index_version)
+            if not self._answers:
+                self.misses += 1
+                return None
+            scores = self._vectors @ self._normalize(embedding)
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                self.hits += 1
+                return self._answers[best]
+            self.misses += 1
+            return None
+
+    def store(self, embedding, answer: str, index_version):
+        with self._lock:
+            if index_version != self._index_version:
+                self._reset(index_version)
+            vector = self._normalize(embedding)[np.newaxis, :]
+            if self._answers:
+                self._vectors = np.vstack([self._vectors, vector])
+            else:
+                self._vectors = vector
+            self._answers.append(answer)
+            if len(self._answers) > self.maxsize:
+                # Oldest entries go first
+                self._vectors = self._vectors[-self.maxsize:]
+                self._answers = self._answers[-self.maxsize:]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._answers),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,253 @@
+# api_server.py
+#
+# Headless HTTP API for the HR Assistant Agent (Slack bot, intranet widget, ...).
+# Run with:  uvicorn api_server:app --host 0.0.0.0 --port 8000
+# Scale out with more uvicorn workers/replicas; they all serve the current index version.
+
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from rag_backend import load_vector_db, get_qa_chain, get_index_version
+from index_jobs import get_job_queue
+from hris_tools import get_pto_cache_stats, get_hris_status
+
+# --- CONFIGURATION ---
+# Warm agents per process; each serves one request at a time
+API_AGENT_POOL_SIZE = int(os.getenv("API_AGENT_POOL_SIZE", "4"))
+# Requests allowed to wait for an agent before new ones are rejected with 503
+API_MAX_QUEUED = int(os.getenv("API_MAX_QUEUED", "32"))
+API_REQUEST_TIMEOUT = float(os.getenv("API_REQUEST_TIMEOUT", "60"))
+# Directories /index/rebuild may read documents from (comma-separated)
+API_DOCUMENT_DIRS = [d.strip() for d in os.getenv("API_DOCUMENT_DIRS", "uploads,sample_policies").split(",") if d.strip()]
+
+_STREAM_DONE = object()
+# Keeps release tasks referenced until they complete
+_background_tasks = set()
+
+
+class AgentPool:
+    """Pool of warm agents for the current index version.
+
+    Agents are created up front, so requests never pay for opening the vector
+    store or building the AgentExecutor. When the index version changes the
+    pool is rebuilt; agents of the old version are dropped as they come back.
+    """
+
+    def __init__(self, size: int, max_queued: int):
+        self.size = size
+        self.max_queued = max_queued
+        self.version = None
+        self.waiting = 0
+        self.busy = 0
+        self._agents = asyncio.Queue()
+        self._reload_lock = asyncio.Lock()
+
+    async def ensure_current(self):
+        version = get_index_version()
+        if version is None:
+            raise HTTPException(status_code=503, detail="No vector DB has been built yet.")
+        if version == self.version:
+            return
+        async with self._reload_lock:
+            if version == self.version:
+                return
+            # Loading the DB and building agents is blocking work; keep it off the event loop.
+            agents = await asyncio.to_thread(self._build_agents, version)
+            # Swap contents rather than the queue itself, so requests already waiting get new agents.
+            while not self._agents.empty():
+                self._agents.get_nowait()
+            for agent in agents:
+                self._agents.put_nowait(agent)
+            self.version = version
+            print(f"--- 🔥 Agent pool warmed: {self.size} agents for index version {version} ---")
+
+    def _build_agents(self, version: str) -> list:
+        vectordb = load_vector_db()
+        return [(version, get_qa_chain(vectordb, version)) for _ in range(self.size)]
+
+    @asynccontextmanager
+    async def agent(self):
+        """Checks out an agent, rejecting the request if too many are already waiting."""
+        await self.ensure_current()
+        if self._agents.empty() and self.waiting >= self.max_queued:
+            raise HTTPException(
+                status_code=503,
+                detail="Server is at capacity, please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+        self.waiting += 1
+        try:
+            version, qa = await self._agents.get()
+        finally:
+            self.waiting -= 1
+        self.busy += 1
+        try:
+            yield qa
+        finally:
+            self.busy -= 1
+            if version == self.version:
+                self._agents.put_nowait((version, qa))
+
+    def stats(self) -> dict:
+        return {
+            "index_version": self.version,
+            "size": self.size,
+            "idle": self._agents.qsize(),
+            "busy": self.busy,
+            "waiting": self.waiting,
+        }
+
+
+pool = AgentPool(API_AGENT_POOL_SIZE, API_MAX_QUEUED)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if get_index_version() is not None:
+        await pool.ensure_current()
+    yield
+
+
+app = FastAPI(title="HR Assistant Agent API", lifespan=lifespan)
+
+
+class AskRequest(BaseModel):
+    query: str
+
+
+class RebuildRequest(BaseModel):
+    pdf_paths: list
+    incremental: bool = True
+
+
+@app.get("/health")
+async def health():
+    version = get_index_version()
+    return {
+        "status": "ok" if version else "no_index",
+        "index_version": version,
+        "pool": pool.stats(),
+        "pto_cache": get_pto_cache_stats(),
+        "hris": get_hris_status(),
+    }
+
+
+@app.post("/ask")
+async def ask(request: AskRequest):
+    if not request.query.strip():
+        raise HTTPException(status_code=400, detail="Please enter a question.")
+    started = time.perf_counter()
+    async with pool.agent() as qa:
+        try:
+            result = await asyncio.wait_for(qa.ainvoke(request.query), timeout=API_REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="The agent did not answer in time.")
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+@app.post("/ask/stream")
+async def ask_stream(request: AskRequest):
+    """Streams agent events as newline-delimited JSON (``token``, ``step``, ..., ``final``)."""
+    if not request.query.strip():
+        raise HTTPException(status_code=400, detail="Please enter a question.")
+    # Checked out here so capacity errors still produce a proper 503 response.
+    checkout = pool.agent()
+    qa = await checkout.__aenter__()
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    abandoned = threading.Event()
+
+    def emit(item):
+        try:
+            loop.call_soon_threadsafe(items.put_nowait, item)
+        except RuntimeError:
+            # The event loop is gone (server shutdown); nobody is listening any more.
+            pass
+
+    def produce():
+        # Runs the agent to completion even if the client stops listening, so the
+        # agent is idle again before it goes back to the pool.
+        try:
+            for event in qa.stream(request.query):
+                if not abandoned.is_set():
+                    emit(event)
+        except Exception as e:
+            if not abandoned.is_set():
+                emit(e)
+        finally:
+            emit(_STREAM_DONE)
+
+    run = loop.run_in_executor(None, produce)
+
+    async def release_when_finished():
+        try:
+            await run
+        finally:
+            await checkout.__aexit__(None, None, None)
+
+    # Scheduled now rather than from the response generator, which never runs if the
+    # client is gone before the first chunk; the task also keeps the checkout referenced.
+    release = asyncio.ensure_future(release_when_finished())
+    _background_tasks.add(release)
+    release.add_done_callback(_background_tasks.discard)
+
+    async def events():
+        deadline = time.monotonic() + API_REQUEST_TIMEOUT
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(items.get(), timeout=max(deadline - time.monotonic(), 0))
+                except asyncio.TimeoutError:
+                    yield json.dumps({"type": "error", "error": "The agent did not answer in time."}) + "\n"
+                    break
+                if item is _STREAM_DONE:
+                    break
+                if isinstance(item, Exception):
+                    yield json.dumps({"type": "error", "error": f"{type(item).__name__}: {item}"}) + "\n"
+                    break
+                yield json.dumps(item, default=str) + "\n"
+        finally:
+            abandoned.set()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+def _allowed_document_path(path: str) -> bool:
+    """True if ``path`` resolves (symlinks included) to a file inside one of API_DOCUMENT_DIRS."""
+    resolved = os.path.realpath(path)
+    for directory in API_DOCUMENT_DIRS:
+        root = os.path.realpath(directory)
+        if os.path.commonpath([resolved, root]) == root and resolved != root:
+            return True
+    return False
+
+
+@app.post("/index/rebuild", status_code=202)
+async def rebuild_index(request: RebuildRequest):
+    # Only documents from the upload and sample directories may be indexed; anything
+    # else (.env, system files) would become readable through /ask.
+    forbidden = [path for path in request.pdf_paths if not _allowed_document_path(str(path))]
+    if forbidden:
+        raise HTTPException(status_code=403, detail=f"Paths outside {API_DOCUMENT_DIRS}: {forbidden}")
+    missing = [path for path in request.pdf_paths if not os.path.exists(path)]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"PDFs not found: {missing}")
+    job_id = get_job_queue().submit(request.pdf_paths, incremental=request.incremental)
+    return {"job_id": job_id, "status_url": f"/index/jobs/{job_id}"}
+
+
+@app.get("/index/jobs/{job_id}")
+async def index_job_status(job_id: int):
+    job = get_job_queue().status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}.")
+    return job
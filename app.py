@@ -2,20 +2,31 @@
 
 import streamlit as st
 import os
-import shutil # New import to handle directory cleanup
-from rag_backend import build_vector_db, load_vector_db, get_qa_chain
+from rag_backend import load_vector_db, get_qa_chain, get_index_version, get_query_cache_stats
+from index_jobs import get_job_queue
+from hris_tools import get_pto_cache_stats
 
 # --- CONFIGURATION ---
-# Assumes CHROMA_PATH is read from .env in rag_backend.py, 
-# but we need it here for cleanup/checking.
-# For simplicity, we hardcode the known path used in rag_backend.py:
-CHROMA_PATH = "db/hr_policy_embeddings" 
+# The vector DB location (CHROMA_PATH) is read from .env in rag_backend.py;
+# builds are versioned there and swapped in atomically, so the app never deletes it.
 UPLOAD_DIR = "uploads"
 DEFAULT_POLICY_PATH = "sample_policies/combined_hr_policy.pdf"
 
 
 st.set_page_config(page_title="HR Assistant Agent", layout="wide")
 
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def load_agent(index_version):
+    """Loads the vector store and builds the agent once per index version.
+
+    Streamlit re-runs this script on every interaction; the cached agent is
+    reused across reruns and sessions until a rebuild changes the version.
+    """
+    vectordb = load_vector_db()
+    return get_qa_chain(vectordb, index_version)
+
+
 st.title("🧑‍💼 HR Assistant Agent (Policy & Action)")
 st.write("Ask questions about HR policies, leave rules, or request actions like checking PTO balance.")
 
@@ -32,16 +43,15 @@ uploaded_files = st.sidebar.file_uploader(
     accept_multiple_files=True
 )
 
+# Incremental mode only embeds new/changed pages and keeps the rest of the index
+incremental = st.sidebar.checkbox("Incremental re-index (only embed new or changed pages)", value=True)
+
 if st.sidebar.button("Build / Rebuild Vector DB"):
     pdf_list = []
 
-    # 1. Cleanup old uploads and DB
-    if os.path.exists(UPLOAD_DIR):
-        shutil.rmtree(UPLOAD_DIR)
+    # 1. Prepare the uploads directory. Files are not wiped here: a queued job may still
+    # need them, and the current DB keeps serving until the new build is promoted.
     os.makedirs(UPLOAD_DIR, exist_ok=True)
-    
-    if os.path.exists(CHROMA_PATH):
-        shutil.rmtree(CHROMA_PATH)
 
     # 2. Collect file paths
     if use_default:
@@ -58,30 +68,73 @@ if st.sidebar.button("Build / Rebuild Vector DB"):
                 f.write(file.getbuffer())
             pdf_list.append(path)
 
-    # 3. Build DB
+    # 3. Queue the build on the background indexing worker
     if pdf_list:
-        with st.spinner("Indexing documents and building vector store..."):
-            try:
-                # build_vector_db now accepts a list of PDF paths
-                vectordb = build_vector_db(pdf_list) 
-                st.session_state['vectordb_ready'] = True
-                st.success(f"Indexing complete! {len(pdf_list)} documents indexed.")
-            except Exception as e:
-                 st.error(f"Error during indexing. Check OPENAI_API_KEY and document format: {e}")
+        job_id = get_job_queue().submit(pdf_list, incremental=incremental)
+        st.sidebar.info(f"Indexing job #{job_id} queued ({len(pdf_list)} documents).")
     else:
         st.error("No PDFs selected to index! Check the default checkbox or upload a file.")
 
+
+def render_index_jobs():
+    """Shows background indexing jobs; reruns the app once a new index version goes live."""
+    # Pick up a freshly promoted index in the rest of the page
+    current_version = get_index_version()
+    if st.session_state.setdefault("index_version_seen", current_version) != current_version:
+        st.session_state["index_version_seen"] = current_version
+        st.rerun()
+
+    job_queue = get_job_queue()
+    jobs = job_queue.jobs()
+    if not jobs:
+        return
+
+    st.markdown("#### 🛠️ Indexing Jobs")
+    for job in jobs[:3]:
+        progress = job["progress"]
+        line = f"**#{job['id']}** {job['state']} — {len(job['pdf_paths'])} files"
+        if job["coalesced"]:
+            line += f" ({job['coalesced']} requests coalesced)"
+        st.markdown(line)
+        if job["state"] == "running":
+            st.caption(
+                f"{progress.get('stage', 'starting')}: "
+                f"{progress.get('files_parsed', 0)}/{progress.get('files_total', '?')} files parsed, "
+                f"{progress.get('chunks_embedded', 0)}/{progress.get('chunks_found', 0)} chunks embedded"
+                + (f", ETA {job['eta_seconds']:.0f}s" if job["eta_seconds"] is not None else "")
+            )
+        elif job["state"] == "failed":
+            st.caption(f"❌ {job['error']}")
+
+    if job_queue.active() and not hasattr(st, "fragment"):
+        st.button("🔄 Refresh indexing status")
+
+
+# Poll job status every few seconds where Streamlit supports fragments
+with st.sidebar:
+    if hasattr(st, "fragment"):
+        st.fragment(run_every=2)(render_index_jobs)()
+    else:
+        render_index_jobs()
+
 # --- Initialize QA Chain ---
 qa = None
-vectordb_ready = st.session_state.get('vectordb_ready', False)
 
-if os.path.exists(CHROMA_PATH) or vectordb_ready:
+if get_index_version() is not None:
     try:
-        # Load existing DB
-        vectordb = load_vector_db()
-        # Get the Tool-Enabled Agent Executor
-        qa = get_qa_chain(vectordb)
+        # Get the Tool-Enabled Agent Executor (cached until the index is rebuilt)
+        qa = load_agent(get_index_version())
         st.sidebar.success("✅ Agent and Knowledge Base Loaded.")
+        cache_stats = get_query_cache_stats()
+        st.sidebar.caption(
+            f"Query embedding cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+            f"({cache_stats['hit_rate']:.0%} hit rate)"
+        )
+        pto_stats = get_pto_cache_stats()
+        st.sidebar.caption(
+            f"PTO balance cache: {pto_stats['hits']} hits / {pto_stats['misses']} misses "
+            f"({pto_stats['hit_rate']:.0%} hit rate)"
+        )
     except Exception as e:
         st.error(f"Error loading Agent/DB: {e}. Please rebuild the Vector DB.")
 else:
@@ -101,21 +154,41 @@ if st.button("Get Answer"):
     elif query.strip() == "":
         st.error("Please enter a question.")
     else:
-        with st.spinner("Agent is searching and deciding whether to use RAG or HRIS Tools..."):
-            try:
-                # The 'qa' variable now points to the execute_agent_query wrapper function
-                result = qa(query) 
-                
-                st.markdown("### ✅ Agent Answer")
-                # The agent's final answer is in the 'result' key
-                st.write(result["result"]) 
-
-                st.markdown("---")
-                st.markdown("### ℹ️ Note on Sources")
-                st.info("Since the Agent can use multiple tools (RAG, HRIS APIs), the source tracking is handled by the Agent's reasoning, not the simple source document list of the previous chain type. Check your terminal output for the Agent's 'verbose' reasoning log.")
-                
-            except Exception as e:
-                st.error(f"An error occurred during query execution: {e}")
+        try:
+            st.markdown("### ✅ Agent Answer")
+            step_status = st.empty()
+            step_status.caption("🤔 Agent is deciding whether to use RAG or HRIS Tools...")
+            answer_box = st.empty()
+            answer = ""
+            result = None
+
+            # Render the answer token by token as the agent streams it
+            for event in qa.stream(query):
+                if event["type"] == "step":
+                    step_status.caption(f"🔧 Using `{event['tool']}`...")
+                    # Text before a tool call was an intermediate turn, not the answer
+                    answer = ""
+                    answer_box.empty()
+                elif event["type"] == "token":
+                    answer += event["text"]
+                    answer_box.markdown(answer + "▌")
+                elif event["type"] == "final":
+                    result = event
+
+            step_status.empty()
+            # The agent's final answer is in the 'result' key
+            answer_box.markdown(result["result"])
+            if result.get("routed"):
+                st.caption(f"⚡ Answered directly by the `{result['routed']}` HRIS tool (no LLM call needed).")
+            elif result.get("cached"):
+                st.caption("⚡ Served from the answer cache (a near-identical policy question was answered recently).")
+
+            st.markdown("---")
+            st.markdown("### ℹ️ Note on Sources")
+            st.info("Since the Agent can use multiple tools (RAG, HRIS APIs), the source tracking is handled by the Agent's reasoning, not the simple source document list of the previous chain type. Check your terminal output for the Agent's 'verbose' reasoning log.")
+            
+        except Exception as e:
+            st.error(f"An error occurred during query execution: {e}")
 
 
 # --- End of app.py ---
\ No newline at end of file
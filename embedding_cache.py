@@ -0,0 +1,160 @@
+# embedding_cache.py
+
+import array
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+
+from langchain_core.embeddings import Embeddings
+
+from ttl_cache import LRUTTLCache
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes text before hashing so trivial whitespace/Unicode differences share a key."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps any LangChain embedder with a persistent SQLite cache.
+
+    Entries are keyed by model name + SHA-256 of the normalized text, so a rebuild
+    after wiping the vector DB, or a repeated query, never hits the network twice.
+    """
+
+    def __init__(self, embedder: Embeddings, model_name: str, cache_path: str):
+        self.embedder = embedder
+        self.model_name = model_name
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _key(self, text: str) -> str:
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{digest}"
+
+    def _lookup(self, keys: list) -> dict:
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for i in range(0, len(unique_keys), 500):
+                batch = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array.array("f", blob).tolist()
+        return found
+
+    def _store(self, items: dict):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, array.array("f", vector).tobytes()) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _missing(keys: list, texts: list, cached: dict) -> dict:
+        """Maps each uncached key to its text, so repeated texts are embedded only once."""
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        return missing
+
+    def embed_documents(self, texts: list) -> list:
+        keys = [self._key(text) for text in texts]
+        cached = self._lookup(keys)
+        missing = self._missing(keys, texts, cached)
+        if missing:
+            vectors = self.embedder.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self._store(fresh)
+            cached.update(fresh)
+
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> list:
+        key = self._key(text)
+        cached = self._lookup([key])
+        if key in cached:
+            return cached[key]
+        vector = self.embedder.embed_query(text)
+        self._store({key: vector})
+        return vector
+
+    async def aembed_documents(self, texts: list) -> list:
+        keys = [self._key(text) for text in texts]
+        cached = self._lookup(keys)
+        missing = self._missing(keys, texts, cached)
+        if missing:
+            vectors = await self.embedder.aembed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self._store(fresh)
+            cached.update(fresh)
+
+        return [cached[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> list:
+        # SQLite lookups are local and sub-millisecond; only the network call is awaited.
+        key = self._key(text)
+        cached = self._lookup([key])
+        if key in cached:
+            return cached[key]
+        vector = await self.embedder.aembed_query(text)
+        self._store({key: vector})
+        return vector
+
+
+def normalize_query(query: str) -> str:
+    """Normalizes a user question so trivially different phrasings share a cache entry."""
+    return normalize_text(query).lower().rstrip(" ?.!")
+
+
+class QueryEmbeddingCache(Embeddings):
+    """Serves repeated query embeddings from an in-memory LRU/TTL cache.
+
+    Sits in front of the retriever's embedder so questions employees ask over
+    and over skip the embedding round trip; document embedding passes through.
+    """
+
+    def __init__(self, embedder: Embeddings, model_name: str, cache: LRUTTLCache):
+        self.embedder = embedder
+        self.model_name = model_name
+        self.cache = cache
+
+    def embed_documents(self, texts: list) -> list:
+        return self.embedder.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list:
+        key = (self.model_name, normalize_query(text))
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embedder.embed_query(text)
+            self.cache.set(key, vector)
+        return vector
+
+    async def aembed_documents(self, texts: list) -> list:
+        return await self.embedder.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list:
+        key = (self.model_name, normalize_query(text))
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = await self.embedder.aembed_query(text)
+            self.cache.set(key, vector)
+        return vector
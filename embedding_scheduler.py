@@ -0,0 +1,241 @@
+# embedding_scheduler.py
+
+import asyncio
+import math
+import random
+import threading
+import time
+
+import httpx
+import openai
+from langchain_core.embeddings import Embeddings
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used only for packing batches."""
+    return max(1, math.ceil(len(text) / 4))
+
+
+class _AdaptiveLimiter:
+    """Concurrency limit that halves on rate limiting and creeps back up on success (AIMD)."""
+
+    def __init__(self, max_limit: int):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.in_flight = 0
+        self._successes = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            while self.in_flight >= self.limit:
+                await self._cond.wait()
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    async def on_rate_limited(self):
+        async with self._cond:
+            self.limit = max(1, self.limit // 2)
+            self._successes = 0
+
+    async def on_success(self):
+        async with self._cond:
+            self._successes += 1
+            if self.limit < self.max_limit and self._successes >= self.limit:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify_all()
+
+
+class BatchedEmbeddings(Embeddings):
+    """OpenAI embedder that packs texts into token-budgeted batches and sends them concurrently.
+
+    Up to ``max_concurrency`` batch requests are in flight at once. A 429 halves
+    the concurrency and retries the batch after an exponential, jittered
+    backoff (honouring ``Retry-After``); successful batches slowly restore it.
+    ``base_url`` can point at any OpenAI-compatible server, e.g. a local stub;
+    ``http_transport``/``async_http_transport`` replace the HTTP layer (see
+    openai_replay.py).
+    After each ``embed_documents`` call, ``last_stats`` holds the achieved
+    throughput.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        api_key: str,
+        base_url: str = None,
+        max_batch_tokens: int = 20000,
+        max_batch_size: int = 256,
+        max_concurrency: int = 4,
+        max_retries: int = 6,
+        http_transport: httpx.BaseTransport = None,
+        async_http_transport: httpx.AsyncBaseTransport = None,
+    ):
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.last_stats = {}
+        self.async_http_transport = async_http_transport
+        # Single queries rely on the SDK's retries; batch requests use the backoff below.
+        self._client = openai.OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=httpx.Client(transport=http_transport) if http_transport else None,
+        )
+        self._async_client = None
+        self._async_client_loop = None
+
+    def _make_async_client(self):
+        # The SDK's own retries are disabled so batch backoff is controlled here.
+        http_client = httpx.AsyncClient(transport=self.async_http_transport) if self.async_http_transport else None
+        return openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0, http_client=http_client)
+
+    def _batches(self, texts: list) -> list:
+        """Packs ``(index, text)`` pairs into batches bounded by tokens and input count."""
+        batches, batch, batch_tokens = [], [], 0
+        for index, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            if batch and (batch_tokens + tokens > self.max_batch_tokens or len(batch) >= self.max_batch_size):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append((index, text))
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+
+    async def _embed_batch(self, client, limiter: _AdaptiveLimiter, batch: list, stats: dict) -> list:
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire()
+            try:
+                response = await client.embeddings.create(model=self.model, input=[text for _, text in batch])
+            except (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError) as e:
+                if attempt == self.max_retries:
+                    raise
+                if isinstance(e, openai.RateLimitError):
+                    stats["rate_limited"] += 1
+                    await limiter.on_rate_limited()
+                delay = self._backoff(attempt, e)
+            else:
+                await limiter.on_success()
+                stats["batches"] += 1
+                return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+            finally:
+                await limiter.release()
+            await asyncio.sleep(delay)
+
+    async def _embed_all(self, client, texts: list) -> list:
+        started = time.perf_counter()
+        stats = {"batches": 0, "rate_limited": 0}
+        limiter = _AdaptiveLimiter(self.max_concurrency)
+        batches = self._batches(texts)
+
+        results = await asyncio.gather(
+            *(self._embed_batch(client, limiter, batch, stats) for batch in batches)
+        )
+
+        vectors = [None] * len(texts)
+        for batch, batch_vectors in zip(batches, results):
+            for (index, _), vector in zip(batch, batch_vectors):
+                vectors[index] = vector
+
+        elapsed = time.perf_counter() - started
+        self.last_stats = {
+            "chunks": len(texts),
+            "batches": stats["batches"],
+            "rate_limited": stats["rate_limited"],
+            "seconds": round(elapsed, 3),
+            "chunks_per_sec": round(len(texts) / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+        if texts:
+            print(
+                f"Embedded {len(texts)} chunks in {stats['batches']} batches "
+                f"({self.last_stats['chunks_per_sec']} chunks/sec, {stats['rate_limited']} rate-limited)"
+            )
+        return vectors
+
+    def _loop_client(self):
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            # HTTP connections are bound to the loop that opened them.
+            if self._async_client is not None:
+                _close_on_loop(self._async_client.close(), self._async_client_loop)
+            self._async_client = self._make_async_client()
+            self._async_client_loop = loop
+        return self._async_client
+
+    async def aembed_documents(self, texts: list) -> list:
+        return await self._embed_all(self._loop_client(), texts)
+
+    async def aembed_query(self, text: str) -> list:
+        # One request with the same backoff as batches, without the throughput report.
+        stats = {"batches": 0, "rate_limited": 0}
+        vectors = await self._embed_batch(self._loop_client(), _AdaptiveLimiter(1), [(0, text)], stats)
+        return vectors[0]
+
+    def embed_documents(self, texts: list) -> list:
+        async def run():
+            async with self._make_async_client() as client:
+                return await self._embed_all(client, texts)
+
+        return _run_sync(run())
+
+    def embed_query(self, text: str) -> list:
+        # A single short request gains nothing from the scheduler; reuse the pooled sync client.
+        response = self._client.embeddings.create(model=self.model, input=[text])
+        return response.data[0].embedding
+
+
+def _close_on_loop(close, loop):
+    """Schedules a client's ``close()`` coroutine on the loop its connections belong to.
+
+    An idle loop runs it the next time it runs. A loop that is already closed
+    can't close its transports any more; their sockets are released when the
+    old client is garbage-collected.
+    """
+    if loop.is_closed():
+        close.close()
+    else:
+        asyncio.run_coroutine_threadsafe(close, loop)
+
+
+def _run_sync(coro):
+    """Runs a coroutine to completion, even if the calling thread already has a running loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result = {}
+
+    def runner():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=runner, name="embedding-scheduler")
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
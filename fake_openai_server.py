@@ -0,0 +1,181 @@
+# fake_openai_server.py
+#
+# Local OpenAI-compatible model server for offline load tests: no network, no API key.
+# Run with:  python fake_openai_server.py --port 8001 --latency-ms 400 --tokens-per-second 60
+# Then point the app at it:  OPENAI_BASE_URL=http://127.0.0.1:8001/v1
+#
+# Chat completions follow a fixed script that drives the agent's RAG path: the first
+# turn calls the policy retriever tool with the user's question, the turn after a tool
+# result answers by quoting it. Embeddings come from the deterministic HashingEmbeddings.
+
+import argparse
+import base64
+import hashlib
+import json
+import time
+import uuid
+from array import array
+
+from local_embeddings import HashingEmbeddings
+from local_http_server import JSONRequestHandler, start_server as start_http_server, wait_until_interrupted
+
+
+class FakeModelConfig:
+    def __init__(self, latency_ms: float = 300, tokens_per_second: float = 50,
+                 embedding_latency_ms: float = 20, dimensions: int = 1536):
+        # Time to first token (chat) and per-request latency (embeddings)
+        self.latency_ms = latency_ms
+        # Streaming throughput after the first token; 0 sends all tokens at once
+        self.tokens_per_second = tokens_per_second
+        self.embedding_latency_ms = embedding_latency_ms
+        self.embedder = HashingEmbeddings(dimensions)
+
+
+def _plan_reply(messages: list, tools: list) -> tuple:
+    """Returns ``(tool_call, text)`` for the next assistant turn; exactly one is set."""
+    # The agent prompt places its scratchpad before the question, so look for any tool result.
+    tool_results = [m for m in messages if m.get("role") == "tool"]
+    if tool_results:
+        quoted = " ".join(str(tool_results[-1].get("content", "")).split())[:300]
+        return None, f"According to the policy documents: {quoted}"
+
+    question = next((str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), "")
+    retriever = next((t["function"] for t in tools or [] if "Retriever" in t["function"]["name"]), None)
+    if retriever is None:
+        return None, f"I can only answer policy questions. You asked: {question}"
+    argument = next(iter(retriever.get("parameters", {}).get("properties", {})), "__arg1")
+    return {
+        # Derived from the question so recordings of the same conversation are identical
+        "id": f"call_{hashlib.sha256(question.encode('utf-8')).hexdigest()[:24]}",
+        "type": "function",
+        "function": {"name": retriever["name"], "arguments": json.dumps({argument: question})},
+    }, None
+
+
+class FakeOpenAIHandler(JSONRequestHandler):
+    @staticmethod
+    def error_payload(message: str) -> dict:
+        return {"error": {"message": message}}
+
+    @property
+    def config(self) -> FakeModelConfig:
+        return self.server.config
+
+    def do_POST(self):
+        payload = self._read_json()
+        if payload is None:
+            return
+
+        if self.path.endswith("/embeddings"):
+            return self._embeddings(payload)
+        if self.path.endswith("/chat/completions"):
+            return self._chat(payload)
+        self._send_json(404, self.error_payload(f"Unknown path {self.path}"))
+
+    def _embeddings(self, payload: dict):
+        texts = payload.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        time.sleep(self.config.embedding_latency_ms / 1000)
+        data = []
+        for index, text in enumerate(texts):
+            vector = self.config.embedder.embed_query(text if isinstance(text, str) else json.dumps(text))
+            if payload.get("encoding_format") == "base64":
+                vector = base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+            data.append({"object": "embedding", "index": index, "embedding": vector})
+        tokens = sum(len(str(text).split()) for text in texts)
+        self._send_json(200, {
+            "object": "list",
+            "data": data,
+            "model": payload.get("model", "fake-embedding"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    def _chat(self, payload: dict):
+        tool_call, text = _plan_reply(payload.get("messages", []), payload.get("tools"))
+        model = payload.get("model", "fake-chat")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        tokens = text.split(" ") if text else []
+        # Rough prompt size (~4 characters per token) so token accounting has something to report
+        usage = {
+            "prompt_tokens": len(json.dumps(payload.get("messages", []))) // 4,
+            "completion_tokens": len(tokens) or 1,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        time.sleep(self.config.latency_ms / 1000)
+
+        if not payload.get("stream"):
+            if self.config.tokens_per_second:
+                time.sleep(max(len(tokens) - 1, 0) / self.config.tokens_per_second)
+            message = {"role": "assistant", "content": text}
+            if tool_call:
+                message["tool_calls"] = [tool_call]
+            return self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_call else "stop"}],
+                "usage": usage,
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta: dict, finish_reason=None, usage=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else [],
+            }
+            if usage:
+                chunk["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        if tool_call:
+            event({"role": "assistant", "content": None, "tool_calls": [{"index": 0, **tool_call}]})
+            event({}, "tool_calls")
+        else:
+            for i, token in enumerate(tokens):
+                if i and self.config.tokens_per_second:
+                    time.sleep(1 / self.config.tokens_per_second)
+                event({"role": "assistant", "content": token if i == 0 else " " + token})
+            event({}, "stop")
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            event(None, usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, config: FakeModelConfig = None) -> tuple:
+    """Starts the server in a daemon thread; returns ``(server, base_url)``. Port 0 picks a free port."""
+    server = start_http_server(FakeOpenAIHandler, host, port, "fake-openai-server", config=config or FakeModelConfig())
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat and embeddings server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=300, help="Chat time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50, help="Chat streaming throughput (0: unlimited)")
+    parser.add_argument("--embedding-latency-ms", type=float, default=20)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    args = parser.parse_args()
+
+    config = FakeModelConfig(args.latency_ms, args.tokens_per_second, args.embedding_latency_ms, args.dimensions)
+    server, base_url = start_server(args.host, args.port, config)
+    print(f"--- 🤖 Fake OpenAI server listening on {base_url} ---")
+    wait_until_interrupted(server)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# hris_benchmark.py
+#
+# Offline benchmark of the HRIS tool path (client pooling, retries, PTO cache) against
+# the local mock HRIS server.
+# Run with:  python hris_benchmark.py --requests 2000 --concurrency 16 --latency-ms 80 --error-rate 0.02
+#            python hris_benchmark.py --mode async --no-cache --rate-limit 200
+# Lookups draw from --distinct employees so repeat reads can hit the PTO cache;
+# --submit-rate of the calls are leave submissions, which invalidate it, and
+# --team-rate are whole-team lookups (check_team_pto_balances by manager).
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from mock_hris_server import MockHRISConfig, start_server
+
+
+def configure(args, base_url: str):
+    """Points hris_tools (read at import time) at the mock server."""
+    os.environ["HRIS_MODE"] = "api"
+    os.environ["HRIS_API_URL"] = base_url
+    os.environ["HRIS_POOL_SIZE"] = str(args.pool_size)
+    os.environ["HRIS_MAX_RETRIES"] = str(args.max_retries)
+    os.environ["HRIS_TIMEOUT"] = str(args.timeout)
+    os.environ["HRIS_BULK_MODE"] = args.bulk_mode
+    if args.no_cache:
+        # Entries expire as soon as they are written
+        os.environ["PTO_CACHE_TTL"] = "0"
+
+
+def plan_calls(args) -> list:
+    """``(tool_name, kwargs)`` for every request, reproducible from --seed."""
+    rng = random.Random(args.seed)
+    employee_ids = [f"E{1001 + i}" for i in rng.sample(range(args.employees), min(args.distinct, args.employees))]
+    # The mock server's teams are consecutive IDs led by their first member
+    managers = [f"E{1001 + i}" for i in range(0, args.employees - 1, max(args.team_size, 2))]
+    calls = []
+    for _ in range(args.requests):
+        employee_id = rng.choice(employee_ids)
+        draw = rng.random()
+        if draw < args.team_rate:
+            calls.append(("check_team_pto_balances", {"manager_id": rng.choice(managers)}))
+        elif draw < args.team_rate + args.submit_rate:
+            calls.append(("submit_leave_request", {
+                "employee_id": employee_id, "start_date": "2025-07-01", "end_date": "2025-07-01",
+                "leave_type": rng.choice(["vacation", "sick", "casual"]),
+            }))
+        else:
+            calls.append(("check_pto_balance", {"employee_id": employee_id}))
+    return calls
+
+
+def failed(result) -> bool:
+    return not isinstance(result, dict) or "error" in result or result.get("status") == "error"
+
+
+def run_sync(tools: dict, calls: list, concurrency: int) -> tuple:
+    next_call = itertools.count()
+    lock = threading.Lock()
+    samples, failures = [], []
+
+    def worker(_):
+        while True:
+            with lock:
+                i = next(next_call)
+            if i >= len(calls):
+                return
+            name, kwargs = calls[i]
+            started = time.perf_counter()
+            result = tools[name](**kwargs)
+            with lock:
+                samples.append(time.perf_counter() - started)
+                if failed(result):
+                    failures.append(result)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    return samples, failures, time.perf_counter() - started
+
+
+def run_async(tools: dict, calls: list, concurrency: int) -> tuple:
+    samples, failures = [], []
+
+    async def one(name: str, kwargs: dict, slots: asyncio.Semaphore):
+        async with slots:
+            started = time.perf_counter()
+            result = await tools[name](**kwargs)
+            samples.append(time.perf_counter() - started)
+            if failed(result):
+                failures.append(result)
+
+    async def main():
+        slots = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(one(name, kwargs, slots) for name, kwargs in calls))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    return samples, failures, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HRIS tools against the mock HRIS server.")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--distinct", type=int, default=200, help="Distinct employees the calls are drawn from")
+    parser.add_argument("--submit-rate", type=float, default=0.05, help="Share of calls that submit leave")
+    parser.add_argument("--team-rate", type=float, default=0.0, help="Share of calls that look up a whole team")
+    parser.add_argument("--bulk-mode", choices=["endpoint", "fanout"], default="endpoint", help="HRIS_BULK_MODE")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the PTO balance cache")
+    parser.add_argument("--pool-size", type=int, default=20, help="HRIS_POOL_SIZE")
+    parser.add_argument("--max-retries", type=int, default=2, help="HRIS_MAX_RETRIES")
+    parser.add_argument("--timeout", type=float, default=5, help="HRIS_TIMEOUT")
+    parser.add_argument("--employees", type=int, default=5000, help="Mock server dataset size")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Mock server median latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Mock server log-normal spread")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Mock server injected failure rate")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Mock server requests per second")
+    parser.add_argument("--team-size", type=int, default=8, help="Mock server employees per team")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    config = MockHRISConfig(args.employees, args.latency_ms, args.latency_sigma, args.error_rate,
+                            rate_limit=args.rate_limit, seed=args.seed, team_size=args.team_size)
+    server, base_url = start_server(config=config)
+    print(f"--- 🏢 Mock HRIS server on {base_url} ---")
+    try:
+        configure(args, base_url)
+        import hris_tools
+
+        tools = hris_tools.HRIS_ASYNC_TOOL_MAP if args.mode == "async" else hris_tools.HRIS_TOOL_MAP
+        run = run_async if args.mode == "async" else run_sync
+        samples, failures, wall_seconds = run(tools, plan_calls(args), args.concurrency)
+        backend = server.state.stats()
+    finally:
+        server.shutdown()
+
+    p50, p95, p99 = np.percentile(np.array(samples) * 1000, [50, 95, 99])
+    report = {
+        "requests": len(samples),
+        "failed": len(failures),
+        "first_failures": failures[:3],
+        "throughput_rps": round(len(samples) / wall_seconds, 2),
+        "latency_ms": {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2)},
+        "pto_cache": hris_tools.get_pto_cache_stats(),
+        "backend": backend,
+    }
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+# hris_client.py
+
+import asyncio
+import random
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# Worth retrying: the backend is overloaded or briefly unavailable
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class HRISError(Exception):
+    """An HRIS call failed after retries; ``status`` is the HTTP status, if any."""
+
+    def __init__(self, message: str, status: int = None):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(HRISError):
+    """The circuit breaker is rejecting calls; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"HRIS circuit open; retry in {retry_after:.0f}s", 503)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Fails HRIS calls fast while the backend is unhealthy.
+
+    Closed: calls go through; ``failure_threshold`` consecutive failures open
+    the circuit. Open: calls are rejected with ``CircuitOpenError`` for
+    ``reset_timeout`` seconds. Half-open: a single probe call is let through;
+    its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raises ``CircuitOpenError`` unless the call may proceed."""
+        with self._lock:
+            if self.state == "closed":
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError(max(remaining, 1.0))
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """Frees the probe slot of a call that ended without an outcome (e.g. cancelled)."""
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+def _is_backend_failure(error: HRISError) -> bool:
+    # Not-found, conflict and validation errors come from a healthy backend.
+    return error.status is None or error.status == 429 or error.status >= 500
+
+
+class HRISClient:
+    """Shared keep-alive client for the HRIS REST API, sync and async.
+
+    One pooled ``requests.Session`` (and one ``httpx.AsyncClient`` per event
+    loop) is reused by every tool call, so calls after the first skip the TCP
+    and TLS handshakes. Every call has connect/read timeouts. Connection
+    errors, timeouts and 429/502/503/504 responses are retried up to
+    ``max_retries`` times with full-jitter exponential backoff, honouring
+    ``Retry-After``. Non-idempotent requests are only retried when the server
+    cannot have acted on them (connect failures, 429, 503). An optional
+    ``CircuitBreaker`` sees each call's final outcome and, while open, makes
+    calls fail at once with ``CircuitOpenError``.
+    """
+
+    def __init__(self, base_url: str, api_key: str = None, timeout: float = 5.0, connect_timeout: float = 2.0,
+                 max_retries: int = 2, pool_size: int = 20, backoff: float = 0.2, max_backoff: float = 5.0,
+                 breaker: CircuitBreaker = None):
+        self.base_url = base_url.rstrip("/") + "/"
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.breaker = breaker
+
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        # pool_block keeps concurrent callers from opening throwaway connections beyond the pool
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._async_client = None
+        self._async_client_loop = None
+
+    def _url(self, path: str) -> str:
+        return self.base_url + path.lstrip("/")
+
+    def _delay(self, attempt: int, retry_after: str = None) -> float:
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), self.max_backoff))
+            except ValueError:
+                pass
+        return delay
+
+    @staticmethod
+    def _retryable_status(status: int, idempotent: bool) -> bool:
+        return status in RETRY_STATUSES and (idempotent or status in (429, 503))
+
+    @staticmethod
+    def _result(status: int, body, method: str, path: str):
+        if status >= 400:
+            detail = body.get("error") if isinstance(body, dict) else None
+            raise HRISError(f"{method} {path} returned {status}" + (f": {detail}" if detail else ""), status)
+        return body
+
+    def _guarded(self, outcome):
+        """Reports a finished call to the breaker; ``outcome`` is the result or the exception raised."""
+        if self.breaker is None:
+            return
+        if isinstance(outcome, BaseException) and not isinstance(outcome, Exception):
+            self.breaker.release()
+        elif isinstance(outcome, Exception) and (not isinstance(outcome, HRISError) or _is_backend_failure(outcome)):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def request(self, method: str, path: str, json: dict = None, timeout: float = None, idempotent: bool = None):
+        """Sends a request and returns the decoded JSON body, raising ``HRISError`` on failure."""
+        if self.breaker is not None:
+            self.breaker.before_call()
+        try:
+            result = self._request(method, path, json, timeout, idempotent)
+        except BaseException as e:
+            self._guarded(e)
+            raise
+        self._guarded(result)
+        return result
+
+    def _request(self, method: str, path: str, json: dict, timeout: float, idempotent: bool):
+        idempotent = method in ("GET", "HEAD", "PUT", "DELETE") if idempotent is None else idempotent
+        timeout = (self.connect_timeout, timeout or self.timeout)
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.request(method, self._url(path), json=json, timeout=timeout)
+            except requests.ConnectionError as e:
+                # A dropped connection may mean the request was processed; only connect timeouts are safe to resend.
+                safe = idempotent or isinstance(e, requests.ConnectTimeout)
+                if last_attempt or not safe:
+                    raise HRISError(f"{method} {path} failed: {e}") from e
+                time.sleep(self._delay(attempt))
+                continue
+            except requests.Timeout as e:
+                if last_attempt or not idempotent:
+                    raise HRISError(f"{method} {path} timed out") from e
+                time.sleep(self._delay(attempt))
+                continue
+
+            if not last_attempt and self._retryable_status(response.status_code, idempotent):
+                time.sleep(self._delay(attempt, response.headers.get("Retry-After")))
+                continue
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            return self._result(response.status_code, body, method, path)
+
+    def _loop_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            # HTTP connections are bound to the loop that opened them, so the old
+            # client is closed there (a closed loop leaves it to garbage collection).
+            if self._async_client is not None and not self._async_client_loop.is_closed():
+                asyncio.run_coroutine_threadsafe(self._async_client.aclose(), self._async_client_loop)
+            self._async_client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            )
+            self._async_client_loop = loop
+        return self._async_client
+
+    async def arequest(self, method: str, path: str, json: dict = None, timeout: float = None, idempotent: bool = None):
+        """Async variant of ``request`` with the same timeouts, retry policy and breaker."""
+        if self.breaker is not None:
+            self.breaker.before_call()
+        try:
+            result = await self._arequest(method, path, json, timeout, idempotent)
+        except BaseException as e:
+            self._guarded(e)
+            raise
+        self._guarded(result)
+        return result
+
+    async def _arequest(self, method: str, path: str, json: dict, timeout: float, idempotent: bool):
+        idempotent = method in ("GET", "HEAD", "PUT", "DELETE") if idempotent is None else idempotent
+        client = self._loop_client()
+        timeout = httpx.Timeout(timeout or self.timeout, connect=self.connect_timeout)
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await client.request(method, self._url(path), json=json, timeout=timeout)
+            except httpx.TransportError as e:
+                safe = idempotent or isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                if last_attempt or not safe:
+                    raise HRISError(f"{method} {path} failed: {type(e).__name__} {e}") from e
+                await asyncio.sleep(self._delay(attempt))
+                continue
+
+            if not last_attempt and self._retryable_status(response.status_code, idempotent):
+                await asyncio.sleep(self._delay(attempt, response.headers.get("Retry-After")))
+                continue
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            return self._result(response.status_code, body, method, path)
+
+    def get(self, path: str, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, json: dict = None, **kwargs):
+        return self.request("POST", path, json=json, **kwargs)
+
+    async def aget(self, path: str, **kwargs):
+        return await self.arequest("GET", path, **kwargs)
+
+    async def apost(self, path: str, json: dict = None, **kwargs):
+        return await self.arequest("POST", path, json=json, **kwargs)
+
+    def close(self):
+        self.session.close()
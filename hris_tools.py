@@ -1,37 +1,170 @@
 # hris_tools.py
 
+import asyncio
 import os
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from hris_client import CircuitBreaker, CircuitOpenError, HRISClient, HRISError
+from ttl_cache import LRUTTLCache
+
 load_dotenv()
 HRIS_API_KEY = os.getenv("HRIS_API_KEY")
 HRIS_API_URL = os.getenv("HRIS_API_URL")
+# "mock" serves the built-in development data; "api" calls HRIS_API_URL
+HRIS_MODE = os.getenv("HRIS_MODE", "mock")
+# Read timeout per attempt and connect timeout, in seconds
+HRIS_TIMEOUT = float(os.getenv("HRIS_TIMEOUT", "5"))
+HRIS_CONNECT_TIMEOUT = float(os.getenv("HRIS_CONNECT_TIMEOUT", "2"))
+# Retries after the first attempt (connection errors, timeouts, 429/5xx)
+HRIS_MAX_RETRIES = int(os.getenv("HRIS_MAX_RETRIES", "2"))
+# Keep-alive connections held open to the HRIS host
+HRIS_POOL_SIZE = int(os.getenv("HRIS_POOL_SIZE", "20"))
+# Consecutive failed calls that open the circuit, and seconds before a recovery probe
+HRIS_BREAKER_FAILURES = int(os.getenv("HRIS_BREAKER_FAILURES", "5"))
+HRIS_BREAKER_RESET = float(os.getenv("HRIS_BREAKER_RESET", "30"))
+# Seconds a PTO balance is served from memory; a successful leave submission evicts it at once
+PTO_CACHE_TTL = float(os.getenv("PTO_CACHE_TTL", "300"))
+PTO_CACHE_SIZE = int(os.getenv("PTO_CACHE_SIZE", "10000"))
+# Team lookups: "endpoint" batches them through POST /balances/bulk, "fanout" sends
+# concurrent single lookups (for HRIS deployments without the bulk endpoint)
+HRIS_BULK_MODE = os.getenv("HRIS_BULK_MODE", "endpoint")
+# Employee IDs per bulk request
+HRIS_BULK_BATCH_SIZE = int(os.getenv("HRIS_BULK_BATCH_SIZE", "100"))
+
+if HRIS_MODE == "api" and not HRIS_API_URL:
+    raise ValueError("HRIS_MODE=api requires HRIS_API_URL.")
+
+# Shared by every tool call (and thread) in the process; None in mock mode
+HRIS_CLIENT = HRISClient(
+    HRIS_API_URL,
+    HRIS_API_KEY,
+    timeout=HRIS_TIMEOUT,
+    connect_timeout=HRIS_CONNECT_TIMEOUT,
+    max_retries=HRIS_MAX_RETRIES,
+    pool_size=HRIS_POOL_SIZE,
+    breaker=CircuitBreaker(HRIS_BREAKER_FAILURES, HRIS_BREAKER_RESET),
+) if HRIS_MODE == "api" else None
+# Per-employee balances; only successful lookups are cached
+PTO_BALANCE_CACHE = LRUTTLCache(maxsize=PTO_CACHE_SIZE, ttl=PTO_CACHE_TTL)
+# Successful submissions per employee, so a lookup that raced one is not cached.
+# Updated from tool threads and the fan-out pool, hence the lock.
+_submission_counts = {}
+_submission_lock = threading.Lock()
+
+def get_pto_cache_stats() -> dict:
+    """Returns size, hits, misses and hit rate of the PTO balance cache."""
+    return PTO_BALANCE_CACHE.stats()
+
+def get_hris_status() -> dict:
+    """Returns the HRIS mode and, when calling the API, its circuit breaker state."""
+    if HRIS_CLIENT is None:
+        return {"mode": HRIS_MODE}
+    return {"mode": HRIS_MODE, "circuit": HRIS_CLIENT.breaker.stats()}
 
 # --- Security Note: The actual user ID must be securely passed from the front-end session ---
 # For demonstration, we'll assume the LLM provides an ID.
 
+# Mock data for current development: E1001 manages a small team
+MOCK_BALANCES = {
+    "E1001": {"vacation": 15, "sick": 8, "casual": 3},
+    "E1002": {"vacation": 12, "sick": 5, "casual": 2},
+    "E1003": {"vacation": 6, "sick": 10, "casual": 1},
+    "E1004": {"vacation": 18, "sick": 2, "casual": 4},
+}
+MOCK_TEAMS = {
+    "E1001": [
+        {"employee_id": "E1002", "name": "Aisha Patel"},
+        {"employee_id": "E1003", "name": "Ben Okafor"},
+        {"employee_id": "E1004", "name": "Carla Smith"},
+    ],
+}
+
+def _unavailable(error: CircuitOpenError) -> dict:
+    # Returned instantly while the circuit is open, so the agent relays it instead of retrying
+    seconds = int(error.retry_after + 0.5)
+    return {
+        "status": "unavailable",
+        "error": f"The HRIS system is temporarily unavailable. Do not retry now; "
+                 f"tell the user to try again in about {seconds} seconds.",
+        "retry_after_seconds": seconds,
+    }
+
+def _balance_error(error: HRISError) -> dict:
+    if isinstance(error, CircuitOpenError):
+        return _unavailable(error)
+    if error.status == 404:
+        return {"error": "Employee ID not found."}
+    return {"error": f"HRIS API failure: {error}"}
+
+def _submission_error(error: HRISError) -> dict:
+    if isinstance(error, CircuitOpenError):
+        return _unavailable(error)
+    return {"status": "error", "message": f"Submission failed: {error}"}
+
+def _leave_payload(employee_id: str, start_date: str, end_date: str, leave_type: str) -> dict:
+    return {"employee_id": employee_id, "start_date": start_date, "end_date": end_date, "leave_type": leave_type}
+
+def _cached_balance(employee_id: str):
+    balance = PTO_BALANCE_CACHE.get(employee_id)
+    # Copies, so callers can't alter the cached entry
+    return dict(balance) if balance is not None else None
+
+def _submission_generation(employee_id: str) -> int:
+    with _submission_lock:
+        return _submission_counts.get(employee_id, 0)
+
+def _remember_balance(employee_id: str, balance: dict, generation: int) -> dict:
+    if isinstance(balance, dict) and "error" not in balance:
+        # Under the lock, so a submission can't land between the check and the write
+        with _submission_lock:
+            if _submission_counts.get(employee_id, 0) == generation:
+                PTO_BALANCE_CACHE.set(employee_id, dict(balance))
+    return balance
+
+def _after_submission(employee_id: str, result: dict) -> dict:
+    # Write-through invalidation: the next lookup sees the pending request's effect
+    if isinstance(result, dict) and result.get("status") == "success":
+        with _submission_lock:
+            _submission_counts[employee_id] = _submission_counts.get(employee_id, 0) + 1
+            PTO_BALANCE_CACHE.invalidate(employee_id)
+    return result
+
 def check_pto_balance(employee_id: str) -> dict:
     """Retrieves the employee's current paid time off (PTO) balance, 
     including vacation, sick, and casual days from the HRIS."""
-    
-    # 1. ACTUAL API CALL LOGIC GOES HERE:
-    # headers = {"Authorization": f"Bearer {HRIS_API_KEY}"}
-    # response = requests.get(f"{HRIS_API_URL}/balances/{employee_id}", headers=headers)
-    # data = response.json()
+    cached = _cached_balance(employee_id)
+    if cached is not None:
+        return cached
+    generation = _submission_generation(employee_id)
+    return _remember_balance(employee_id, _fetch_pto_balance(employee_id), generation)
+
+def _fetch_pto_balance(employee_id: str) -> dict:
+    # 1. Real HRIS API, when configured
+    if HRIS_CLIENT is not None:
+        try:
+            return HRIS_CLIENT.get(f"balances/{employee_id}")
+        except HRISError as e:
+            return _balance_error(e)
     
     # 2. Mock Data for current development:
-    if employee_id == "E1001":
-        return {"vacation": 15, "sick": 8, "casual": 3}
+    if employee_id in MOCK_BALANCES:
+        return dict(MOCK_BALANCES[employee_id])
     else:
         return {"error": "Employee ID not found or API failure."}
 
 def submit_leave_request(employee_id: str, start_date: str, end_date: str, leave_type: str) -> dict:
     """Submits a formal leave request to the HRIS for manager approval."""
-    
-    # 1. ACTUAL API CALL LOGIC GOES HERE:
-    # payload = {...}
-    # response = requests.post(f"{HRIS_API_URL}/requests", json=payload)
+    return _after_submission(employee_id, _send_leave_request(employee_id, start_date, end_date, leave_type))
+
+def _send_leave_request(employee_id: str, start_date: str, end_date: str, leave_type: str) -> dict:
+    # 1. Real HRIS API, when configured
+    if HRIS_CLIENT is not None:
+        try:
+            return HRIS_CLIENT.post("requests", json=_leave_payload(employee_id, start_date, end_date, leave_type))
+        except HRISError as e:
+            return _submission_error(e)
     
     # 2. Mock Data for current development:
     if leave_type.lower() == "vacation":
@@ -39,10 +172,207 @@ def submit_leave_request(employee_id: str, start_date: str, end_date: str, leave
     else:
         return {"status": "error", "message": "Submission failed. Check dates."}
 
+def _roster_error(error: HRISError) -> dict:
+    if isinstance(error, CircuitOpenError):
+        return _unavailable(error)
+    if error.status == 404:
+        return {"error": "No direct reports found for this manager ID."}
+    return {"error": f"HRIS API failure: {error}"}
+
+def get_team_roster(manager_id: str) -> dict:
+    """Lists the employees who report to a manager (employee IDs and names) from the HRIS."""
+    if HRIS_CLIENT is not None:
+        try:
+            return HRIS_CLIENT.get(f"teams/{manager_id}")
+        except HRISError as e:
+            return _roster_error(e)
+    if manager_id not in MOCK_TEAMS:
+        return {"error": "No direct reports found for this manager ID."}
+    return {"manager_id": manager_id, "members": [dict(member) for member in MOCK_TEAMS[manager_id]]}
+
+def _unique_ids(employee_ids) -> list:
+    cleaned = (str(employee_id).strip() for employee_id in employee_ids or [] if employee_id)
+    return list(dict.fromkeys(employee_id for employee_id in cleaned if employee_id))
+
+def _batches(employee_ids: list) -> list:
+    return [employee_ids[i:i + HRIS_BULK_BATCH_SIZE] for i in range(0, len(employee_ids), HRIS_BULK_BATCH_SIZE)]
+
+class _TeamLookup:
+    """Collects one team lookup: cache hits first, then whatever the HRIS returns for the rest."""
+
+    def __init__(self, employee_ids: list, roster: dict = None):
+        self.employee_ids = employee_ids
+        self.roster = roster
+        self.balances = {}
+        self.errors = {}
+        self.unavailable = None
+        self.missing = []
+        for employee_id in employee_ids:
+            cached = _cached_balance(employee_id)
+            if cached is not None:
+                self.balances[employee_id] = cached
+            else:
+                self.missing.append(employee_id)
+        self.generations = {employee_id: _submission_generation(employee_id) for employee_id in self.missing}
+
+    def add(self, employee_id: str, balance: dict):
+        if isinstance(balance, dict) and "error" not in balance:
+            self.balances[employee_id] = _remember_balance(employee_id, balance, self.generations[employee_id])
+        elif isinstance(balance, dict) and balance.get("status") == "unavailable":
+            self.unavailable = balance
+        else:
+            self.errors[employee_id] = (balance or {}).get("error", "No balance returned.")
+
+    def add_bulk(self, batch: list, body):
+        found = (body or {}).get("balances") or {}
+        for employee_id in batch:
+            self.add(employee_id, found.get(employee_id) or {"error": "Employee ID not found."})
+
+    def fail_batch(self, batch: list, error: HRISError):
+        for employee_id in batch:
+            self.add(employee_id, _balance_error(error))
+
+    def result(self) -> dict:
+        result = self.unavailable.copy() if self.unavailable else {}
+        if self.roster is not None:
+            result["manager_id"] = self.roster.get("manager_id")
+            result["members"] = self.roster.get("members", [])
+        result["balances"] = {e: self.balances[e] for e in self.employee_ids if e in self.balances}
+        if self.errors:
+            result["errors"] = self.errors
+        return result
+
+def _team_employee_ids(employee_ids, roster: dict) -> list:
+    if roster is not None:
+        employee_ids = [member.get("employee_id") for member in roster.get("members", [])]
+    return _unique_ids(employee_ids)
+
+def check_team_pto_balances(employee_ids: list[str] = None, manager_id: str = None) -> dict:
+    """Retrieves PTO balances (vacation, sick, and casual days) for many employees in ONE step:
+    pass a manager_id to cover everyone reporting to that manager, or a list of employee_ids.
+    Use this for team-level questions instead of calling check_pto_balance once per employee."""
+    roster = None
+    if manager_id:
+        roster = get_team_roster(manager_id)
+        if "error" in roster:
+            return roster
+    lookup = _TeamLookup(_team_employee_ids(employee_ids, roster), roster)
+    if not lookup.employee_ids:
+        return {"error": "Provide a manager_id or a non-empty list of employee_ids."}
+
+    if lookup.missing and HRIS_CLIENT is None:
+        for employee_id in lookup.missing:
+            lookup.add(employee_id, _fetch_pto_balance(employee_id))
+    elif lookup.missing and HRIS_BULK_MODE == "fanout":
+        with ThreadPoolExecutor(max_workers=min(HRIS_POOL_SIZE, len(lookup.missing))) as pool:
+            for employee_id, balance in zip(lookup.missing, pool.map(_fetch_pto_balance, lookup.missing)):
+                lookup.add(employee_id, balance)
+    elif lookup.missing:
+        for batch in _batches(lookup.missing):
+            try:
+                # A read, so safe to retry despite being a POST
+                body = HRIS_CLIENT.post("balances/bulk", json={"employee_ids": batch}, idempotent=True)
+            except HRISError as e:
+                lookup.fail_batch(batch, e)
+                continue
+            lookup.add_bulk(batch, body)
+    return lookup.result()
+
+# --- Async variants (used by the agent's ainvoke path) ---
+# API calls go through the client's async pool so concurrent agent runs never
+# block the event loop; the mock data needs no I/O.
+
+async def acheck_pto_balance(employee_id: str) -> dict:
+    """Retrieves the employee's current paid time off (PTO) balance, 
+    including vacation, sick, and casual days from the HRIS."""
+    cached = _cached_balance(employee_id)
+    if cached is not None:
+        return cached
+    generation = _submission_generation(employee_id)
+    if HRIS_CLIENT is None:
+        return _remember_balance(employee_id, _fetch_pto_balance(employee_id), generation)
+    try:
+        balance = await HRIS_CLIENT.aget(f"balances/{employee_id}")
+    except HRISError as e:
+        return _balance_error(e)
+    return _remember_balance(employee_id, balance, generation)
+
+async def asubmit_leave_request(employee_id: str, start_date: str, end_date: str, leave_type: str) -> dict:
+    """Submits a formal leave request to the HRIS for manager approval."""
+    if HRIS_CLIENT is None:
+        return submit_leave_request(employee_id, start_date, end_date, leave_type)
+    try:
+        result = await HRIS_CLIENT.apost("requests", json=_leave_payload(employee_id, start_date, end_date, leave_type))
+    except HRISError as e:
+        return _submission_error(e)
+    return _after_submission(employee_id, result)
+
+async def aget_team_roster(manager_id: str) -> dict:
+    """Lists the employees who report to a manager (employee IDs and names) from the HRIS."""
+    if HRIS_CLIENT is None:
+        return get_team_roster(manager_id)
+    try:
+        return await HRIS_CLIENT.aget(f"teams/{manager_id}")
+    except HRISError as e:
+        return _roster_error(e)
+
+async def _afetch_pto_balance(employee_id: str, slots: asyncio.Semaphore) -> dict:
+    async with slots:
+        try:
+            return await HRIS_CLIENT.aget(f"balances/{employee_id}")
+        except HRISError as e:
+            return _balance_error(e)
+
+async def _abulk_balances(batch: list):
+    try:
+        return await HRIS_CLIENT.apost("balances/bulk", json={"employee_ids": batch}, idempotent=True)
+    except HRISError as e:
+        return e
+
+async def acheck_team_pto_balances(employee_ids: list[str] = None, manager_id: str = None) -> dict:
+    """Retrieves PTO balances (vacation, sick, and casual days) for many employees in ONE step:
+    pass a manager_id to cover everyone reporting to that manager, or a list of employee_ids.
+    Use this for team-level questions instead of calling check_pto_balance once per employee."""
+    if HRIS_CLIENT is None:
+        return check_team_pto_balances(employee_ids, manager_id)
+    roster = None
+    if manager_id:
+        roster = await aget_team_roster(manager_id)
+        if "error" in roster:
+            return roster
+    lookup = _TeamLookup(_team_employee_ids(employee_ids, roster), roster)
+    if not lookup.employee_ids:
+        return {"error": "Provide a manager_id or a non-empty list of employee_ids."}
+
+    if lookup.missing and HRIS_BULK_MODE == "fanout":
+        # No more requests in flight than the connection pool holds
+        slots = asyncio.Semaphore(HRIS_POOL_SIZE)
+        balances = await asyncio.gather(*(_afetch_pto_balance(e, slots) for e in lookup.missing))
+        for employee_id, balance in zip(lookup.missing, balances):
+            lookup.add(employee_id, balance)
+    elif lookup.missing:
+        batches = _batches(lookup.missing)
+        for batch, body in zip(batches, await asyncio.gather(*(_abulk_balances(batch) for batch in batches))):
+            if isinstance(body, HRISError):
+                lookup.fail_batch(batch, body)
+            else:
+                lookup.add_bulk(batch, body)
+    return lookup.result()
+
 # You would add get_benefits_summary, check_policy_eligibility, etc., here.
 
 # A dictionary to easily map tool names to the actual functions
 HRIS_TOOL_MAP = {
     "check_pto_balance": check_pto_balance,
     "submit_leave_request": submit_leave_request,
+    "get_team_roster": get_team_roster,
+    "check_team_pto_balances": check_team_pto_balances,
+}
+
+# Async counterparts, keyed by the same tool names
+HRIS_ASYNC_TOOL_MAP = {
+    "check_pto_balance": acheck_pto_balance,
+    "submit_leave_request": asubmit_leave_request,
+    "get_team_roster": aget_team_roster,
+    "check_team_pto_balances": acheck_team_pto_balances,
 }
\ No newline at end of file
@@ -0,0 +1,143 @@
+# index_jobs.py
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+from rag_backend import build_vector_db
+
+# How many finished jobs to remember for the status panel / API
+JOB_HISTORY_LIMIT = 20
+
+
+class IndexJobQueue:
+    """Runs index builds on a background worker thread, one at a time.
+
+    Submissions made while another job is still queued are coalesced into it
+    (union of PDF paths), so a burst of uploads triggers a single build. Job
+    status, including progress counters and an ETA, is available via
+    ``status()`` / ``jobs()`` for the UI or an API to poll.
+    """
+
+    def __init__(self, build_fn=build_vector_db):
+        self.build_fn = build_fn
+        self._jobs = OrderedDict()
+        self._pending = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._worker = threading.Thread(target=self._run, name="index-worker", daemon=True)
+        self._worker.start()
+
+    def submit(self, pdf_paths: list, incremental: bool = True) -> int:
+        """Queues a build and returns its job ID (an existing queued job's ID if coalesced)."""
+        with self._lock:
+            if self._pending:
+                job = self._jobs[self._pending[-1]]
+                job["pdf_paths"] = list(dict.fromkeys(job["pdf_paths"] + list(pdf_paths)))
+                # A full rebuild request wins over incremental ones.
+                job["incremental"] = job["incremental"] and incremental
+                job["coalesced"] += 1
+                return job["id"]
+
+            job_id = next(self._ids)
+            self._jobs[job_id] = {
+                "id": job_id,
+                "pdf_paths": list(dict.fromkeys(pdf_paths)),
+                "incremental": incremental,
+                "state": "queued",
+                "coalesced": 0,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "progress": {},
+                "error": None,
+            }
+            self._pending.append(job_id)
+            self._trim_history()
+            self._wakeup.notify()
+            return job_id
+
+    def status(self, job_id: int):
+        """Returns a snapshot of one job (with ``eta_seconds`` while running), or None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def jobs(self) -> list:
+        """Returns snapshots of recent jobs, newest first."""
+        with self._lock:
+            return [self._snapshot(job) for job in reversed(self._jobs.values())]
+
+    def active(self) -> bool:
+        """True while a job is queued or running."""
+        with self._lock:
+            return any(job["state"] in ("queued", "running") for job in self._jobs.values())
+
+    def _snapshot(self, job: dict) -> dict:
+        snapshot = dict(job, pdf_paths=list(job["pdf_paths"]), progress=dict(job["progress"]))
+        snapshot["eta_seconds"] = self._eta(job)
+        return snapshot
+
+    @staticmethod
+    def _eta(job: dict):
+        if job["state"] != "running":
+            return None
+        progress = job["progress"]
+        files_total = progress.get("files_total") or 0
+        if not files_total:
+            return None
+        parsed_fraction = progress.get("files_parsed", 0) / files_total
+        chunks_found = progress.get("chunks_found", 0)
+        embedded_fraction = progress.get("chunks_embedded", 0) / chunks_found if chunks_found else 1.0
+        done = parsed_fraction * embedded_fraction
+        if done <= 0:
+            return None
+        elapsed = time.time() - job["started_at"]
+        return round(elapsed * (1 - done) / done, 1)
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["state"] in ("succeeded", "failed")]
+        for job_id in finished[:max(0, len(finished) - JOB_HISTORY_LIMIT)]:
+            del self._jobs[job_id]
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._wakeup.wait()
+                job = self._jobs[self._pending.pop(0)]
+                job["state"] = "running"
+                job["started_at"] = time.time()
+                pdf_paths = list(job["pdf_paths"])
+                incremental = job["incremental"]
+
+            def progress(**counters):
+                with self._lock:
+                    job["progress"].update(counters)
+
+            try:
+                db = self.build_fn(pdf_paths, incremental=incremental, progress=progress)
+                state, error = ("succeeded", None) if db is not None else ("failed", "No documents loaded successfully.")
+            except Exception as e:
+                print(f"Error during background indexing job {job['id']}: {e}")
+                state, error = "failed", str(e)
+
+            with self._lock:
+                job["state"] = state
+                job["error"] = error
+                job["finished_at"] = time.time()
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> IndexJobQueue:
+    """Returns the process-wide job queue, starting its worker on first use."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = IndexJobQueue()
+        return _job_queue
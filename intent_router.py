@@ -0,0 +1,209 @@
+# intent_router.py
+
+import math
+import re
+from collections import Counter
+
+from hris_tools import HRIS_TOOL_MAP, HRIS_ASYNC_TOOL_MAP
+
+# Minimum classifier probability before a query bypasses the agent
+ROUTER_MIN_CONFIDENCE = 0.8
+
+# --- 1. Rules ---
+LEAVE_TYPES = ("vacation", "sick", "casual")
+LEAVE_WORD_PATTERN = re.compile(r"\b(vacation|sick|casual|pto|leaves?|days? off)\b", re.IGNORECASE)
+# Explicit balance wording, or "how many ... do I have" with nothing after it
+BALANCE_PATTERN = re.compile(
+    r"\b(left|remaining|balances?)\b|\bhow (many|much)\b.*\b(do i have|have i got)\W*$",
+    re.IGNORECASE,
+)
+# Past usage, future or conditional balances, obligations and public holidays aren't today's balance
+QUALIFIER_PATTERN = re.compile(
+    r"\b(used|taken|took|will|would|after|before|if|when|have to|holidays?|"
+    r"(in|by|until) (jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*)\b",
+    re.IGNORECASE,
+)
+# Questions about the rules themselves belong to the policy retriever
+POLICY_PATTERN = re.compile(
+    r"\b(policy|policies|per year|annually|carry|carried|entitled|eligible|rules?|allowed|how do|how can|process)\b",
+    re.IGNORECASE,
+)
+SUBMIT_PATTERN = re.compile(r"\b(apply|submit|request|book|take)\b", re.IGNORECASE)
+# The router only answers for the caller: any employee ID or other person goes to the agent
+EMPLOYEE_ID_PATTERN = re.compile(r"\bE\d{3,}\b", re.IGNORECASE)
+THIRD_PARTY_PATTERN = re.compile(
+    r"\b(manager|boss|team|colleagues?|co-?workers?|employees?|his|her|their|"
+    r"(does|did|has) (?!my\b)\w+ (have|got|take|used))\b",
+    re.IGNORECASE,
+)
+# Team-level questions belong to the agent's check_team_pto_balances tool
+TEAM_PATTERN = re.compile(
+    r"\b((direct )?reports|staff|members|everyone|anyone|each of|who (on|in|has|have)|which of)\b",
+    re.IGNORECASE,
+)
+# What happens to a balance on leaving the company is a policy question
+PAYOUT_PATTERN = re.compile(
+    r"\b(paid out|pay ?out|encash\w*|cash(ed)? out|quit|quitting|resign\w*|terminat\w*|leave the company|exit|final settlement)\b",
+    re.IGNORECASE,
+)
+
+# --- 2. Local classifier training data ---
+TRAINING_EXAMPLES = {
+    "check_pto_balance": [
+        "how many vacation days do i have left",
+        "what is my pto balance",
+        "how many sick leaves do i have remaining",
+        "check my leave balance",
+        "how much casual leave is left for me",
+        "show my remaining vacation days",
+        "do i have any pto left",
+        "what is my current leave balance",
+        "what is my pto balance right now",
+        "tell me my pto balance",
+        "what is my pto balance please",
+        "how many vacation days do i have",
+        "how many days off do i have left",
+        "do i have vacation days left",
+        "how many sick days do i have left",
+        "how many casual leaves do i have remaining",
+        "how many pto days do i have",
+        "how many leaves do i have left",
+        "how many vacation days are remaining for me",
+        "how many sick leaves do i have",
+    ],
+    "submit_leave_request": [
+        "apply for vacation from 2024-07-01 to 2024-07-05",
+        "submit a sick leave request for tomorrow",
+        "i want to take casual leave next week",
+        "book vacation days from monday to friday",
+        "request leave from 2024-12-20 to 2024-12-31",
+        "please submit my leave request",
+        "i need to apply for leave",
+        "file a vacation request for next month",
+    ],
+    "other": [
+        "what is the work from home policy",
+        "how many vacation days are employees entitled to per year",
+        "can unused leave be carried forward",
+        "what is the notice period",
+        "how do i raise a grievance",
+        "what does health insurance cover",
+        "what is the sick leave policy",
+        "how is the appraisal cycle run",
+        "what are the working hours",
+        "is maternity leave paid",
+        "how many vacation days does e1002 have left",
+        "what is my manager's pto balance",
+        "is my leave balance paid out when i quit",
+        "how many vacation days does my team have left",
+        "which of my direct reports have more than ten vacation days",
+        "how many sick days do my reports have left",
+        "do i have to use my vacation days before december",
+        "how many holidays do i have this year",
+        "how many vacation days have i used",
+        "how many leaves have i used this year",
+        "how many vacation days will i have left in march",
+        "how many vacation days will i have after my two week trip",
+    ],
+}
+
+
+def _tokenize(text: str) -> list:
+    return re.findall(r"[a-z]+", text.lower())
+
+
+class IntentRouter:
+    """Answers high-confidence PTO balance lookups without calling the LLM.
+
+    A query is routed only when the hand-written balance rule matches and a
+    small naive Bayes classifier agrees with at least ``min_confidence``. The
+    tool result is then phrased with a template. Only the caller's own balance
+    is ever looked up; writes such as leave submissions always go through the
+    agent. Anything uncertain returns None, and the caller falls back to the agent.
+    """
+
+    def __init__(self, min_confidence: float = ROUTER_MIN_CONFIDENCE, examples: dict = None):
+        self.min_confidence = min_confidence
+        examples = examples or TRAINING_EXAMPLES
+        self.vocabulary = {token for texts in examples.values() for text in texts for token in _tokenize(text)}
+        total = sum(len(texts) for texts in examples.values())
+        self.log_priors = {}
+        self.log_likelihoods = {}
+        self.log_unseen = {}
+        for intent, texts in examples.items():
+            counts = Counter(token for text in texts for token in _tokenize(text))
+            denominator = sum(counts.values()) + len(self.vocabulary)
+            self.log_priors[intent] = math.log(len(texts) / total)
+            self.log_likelihoods[intent] = {
+                token: math.log((count + 1) / denominator) for token, count in counts.items()
+            }
+            self.log_unseen[intent] = math.log(1 / denominator)
+
+    def classify(self, query: str) -> tuple:
+        """Returns ``(intent, probability)`` from the naive Bayes classifier."""
+        tokens = [token for token in _tokenize(query) if token in self.vocabulary]
+        scores = {
+            intent: prior + sum(self.log_likelihoods[intent].get(t, self.log_unseen[intent]) for t in tokens)
+            for intent, prior in self.log_priors.items()
+        }
+        best = max(scores, key=scores.get)
+        normalizer = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1 / normalizer
+
+    def _match_rules(self, query: str, employee_id: str):
+        """Returns ``(intent, tool kwargs)`` if a rule matches unambiguously, else None."""
+        if POLICY_PATTERN.search(query) or PAYOUT_PATTERN.search(query) or QUALIFIER_PATTERN.search(query):
+            return None
+        if EMPLOYEE_ID_PATTERN.search(query) or THIRD_PARTY_PATTERN.search(query) or TEAM_PATTERN.search(query):
+            return None
+
+        if not SUBMIT_PATTERN.search(query) and LEAVE_WORD_PATTERN.search(query) and BALANCE_PATTERN.search(query):
+            return "check_pto_balance", {"employee_id": employee_id}
+
+        return None
+
+    def plan(self, query: str, employee_id: str):
+        """Returns ``(intent, tool kwargs)`` when the query can bypass the agent, else None."""
+        match = self._match_rules(query, employee_id)
+        if match is None or match[0] not in HRIS_TOOL_MAP:
+            return None
+        intent, confidence = self.classify(query)
+        if intent != match[0] or confidence < self.min_confidence:
+            return None
+        return match
+
+    @staticmethod
+    def render(intent: str, query: str, result: dict) -> str:
+        """Phrases a tool result as the final answer."""
+        if result.get("status") == "unavailable":
+            # The tool's own message is addressed to the agent, not the user
+            seconds = result.get("retry_after_seconds")
+            wait = f"in about {seconds} second{'s' if seconds != 1 else ''}" if seconds else "in a little while"
+            return f"The HR system is temporarily unavailable, so I can't check that right now. Please try again {wait}."
+        if intent == "check_pto_balance":
+            if "error" in result:
+                return f"Sorry, I couldn't retrieve your PTO balance: {result['error']}"
+            asked = [leave for leave in LEAVE_TYPES if re.search(rf"\b{leave}\b", query, re.IGNORECASE)]
+            if len(asked) == 1 and asked[0] in result:
+                return f"You have {result[asked[0]]} {asked[0]} days left."
+            return (
+                f"Your current PTO balance: {result.get('vacation', 0)} vacation, "
+                f"{result.get('sick', 0)} sick and {result.get('casual', 0)} casual days."
+            )
+        return result.get("message") or result.get("error") or "Sorry, I couldn't complete that request."
+
+    def route(self, query: str, employee_id: str):
+        """Answers the query directly from the HRIS tool, or returns None to fall back to the agent."""
+        plan = self.plan(query, employee_id)
+        if plan is None:
+            return None
+        intent, kwargs = plan
+        return {"intent": intent, "result": self.render(intent, query, HRIS_TOOL_MAP[intent](**kwargs))}
+
+    async def aroute(self, query: str, employee_id: str):
+        plan = self.plan(query, employee_id)
+        if plan is None:
+            return None
+        intent, kwargs = plan
+        result = await HRIS_ASYNC_TOOL_MAP[intent](**kwargs)
+        return {"intent": intent, "result": self.render(intent, query, result)}
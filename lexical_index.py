@@ -0,0 +1,119 @@
+# lexical_index.py
+
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+from langchain_core.documents import Document
+
+LEXICAL_INDEX_FILE = "lexical_index.json"
+
+# Kept short on purpose: acronyms and codes ("LOP", "FMLA", "PF") must survive.
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its my of on or "
+    "the this to was what when where which who will with".split()
+)
+
+
+def tokenize(text: str) -> list:
+    return [token for token in re.findall(r"[a-z0-9]+", text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """In-process BM25 inverted index over chunk texts, keyed by chunk ID.
+
+    Only the chunk texts and metadata are persisted; postings and document
+    lengths are rebuilt in memory on load, which takes milliseconds for tens
+    of thousands of chunks.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents = {}
+        self._postings = defaultdict(dict)
+        self._lengths = {}
+        self._total_length = 0
+
+    def add(self, ids: list, documents: list):
+        for chunk_id, document in zip(ids, documents):
+            if chunk_id in self.documents:
+                self.remove([chunk_id])
+            self.documents[chunk_id] = {"text": document.page_content, "metadata": document.metadata}
+            self._index(chunk_id, document.page_content)
+
+    def _index(self, chunk_id: str, text: str):
+        counts = Counter(tokenize(text))
+        for token, count in counts.items():
+            self._postings[token][chunk_id] = count
+        length = sum(counts.values())
+        self._lengths[chunk_id] = length
+        self._total_length += length
+
+    def remove(self, ids: list):
+        for chunk_id in ids:
+            document = self.documents.pop(chunk_id, None)
+            if document is None:
+                continue
+            for token in set(tokenize(document["text"])):
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self._postings[token]
+            self._total_length -= self._lengths.pop(chunk_id)
+
+    def search(self, query: str, k: int) -> list:
+        """Returns up to ``k`` ``(chunk_id, score)`` pairs, best first."""
+        if not self.documents:
+            return []
+        n_docs = len(self.documents)
+        avg_length = self._total_length / n_docs or 1.0
+        scores = defaultdict(float)
+        for token in set(tokenize(query)):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / avg_length)
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def get_document(self, chunk_id: str) -> Document:
+        document = self.documents[chunk_id]
+        return Document(page_content=document["text"], metadata=document["metadata"], id=chunk_id)
+
+    def save(self, index_dir: str):
+        path = os.path.join(index_dir, LEXICAL_INDEX_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "documents": self.documents}, f)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, index_dir: str):
+        """Loads the index stored in ``index_dir``, or returns None if there is none."""
+        path = os.path.join(index_dir, LEXICAL_INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.documents = data["documents"]
+        for chunk_id, document in index.documents.items():
+            index._index(chunk_id, document["text"])
+        return index
+
+    @classmethod
+    def from_vectorstore(cls, db):
+        """Builds the index from every chunk already stored in a Chroma collection."""
+        index = cls()
+        stored = db.get(include=["documents", "metadatas"])
+        documents = [
+            Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(stored["documents"], stored["metadatas"])
+        ]
+        index.add(stored["ids"], documents)
+        return index
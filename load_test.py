@@ -0,0 +1,184 @@
+# load_test.py
+#
+# Deterministic load test of the full execute_agent_query path, with no network.
+#   Fake model server:  python load_test.py --latency-ms 400 --tokens-per-second 60 --requests 200 --concurrency 8
+#   Record, then replay: python load_test.py --record db/openai_cassette.jsonl
+#                        python load_test.py --replay db/openai_cassette.jsonl --requests 500
+# Model time is measured at the HTTP layer, so the report separates it from framework
+# overhead (routing, caches, retrieval, agent loop). Replays have ~zero model time.
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from fake_openai_server import FakeModelConfig, start_server
+
+DEFAULT_QA_PATH = "sample_policies/retrieval_qa.json"
+DEFAULT_DOCS = ["sample_policies/combined_hr_policy.pdf"]
+
+
+def configure(args, workdir: str):
+    """Points rag_backend (read at import time) at the fake server or the cassette."""
+    os.environ["CHROMA_PATH"] = os.path.join(workdir, "db")
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(workdir, "embedding_cache.sqlite3")
+    if not args.answer_cache:
+        # Cosine similarity never reaches 2, so every question goes through the agent
+        os.environ["ANSWER_CACHE_THRESHOLD"] = "2"
+
+    if args.replay:
+        os.environ["OPENAI_CASSETTE_MODE"] = "replay"
+        os.environ["OPENAI_CASSETTE_PATH"] = args.replay
+        # Requests are keyed by body only, so any base URL replays the same recording.
+        os.environ["OPENAI_BASE_URL"] = "http://replay.invalid/v1"
+        return None
+
+    server = None
+    if not args.real_api:
+        config = FakeModelConfig(args.latency_ms, args.tokens_per_second, args.embedding_latency_ms)
+        server, base_url = start_server(config=config)
+        os.environ["OPENAI_BASE_URL"] = base_url
+        print(f"--- 🤖 Fake OpenAI server on {base_url} ---")
+    os.environ["OPENAI_CASSETTE_MODE"] = "record" if args.record else "passthrough"
+    if args.record:
+        os.environ["OPENAI_CASSETTE_PATH"] = args.record
+    return server
+
+
+def summarize(samples: list, errors: list, wall_seconds: float) -> dict:
+    totals = np.array([total for total, _, _ in samples]) * 1000
+    models = np.array([model for _, model, _ in samples]) * 1000
+    overheads = totals - models
+
+    def percentiles(values) -> dict:
+        if not len(values):
+            return {}
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2)}
+
+    return {
+        "requests": len(samples) + len(errors),
+        "errors": len(errors),
+        "first_errors": errors[:3],
+        "throughput_rps": round(len(samples) / wall_seconds, 2) if wall_seconds else None,
+        "latency_ms": percentiles(totals),
+        "model_ms": percentiles(models),
+        "framework_overhead_ms": percentiles(overheads),
+        "model_calls_per_request": round(float(np.mean([calls for _, _, calls in samples])), 2) if samples else None,
+    }
+
+
+def run_sync(agents: list, queries: list, requests: int, track_model_time) -> tuple:
+    """Each of ``len(agents)`` threads owns one agent, like the API server's pool."""
+    next_query = itertools.count()
+    lock = threading.Lock()
+    samples, errors = [], []
+
+    def worker(qa):
+        while True:
+            with lock:
+                i = next(next_query)
+            if i >= requests:
+                return
+            query = queries[i % len(queries)]
+            started = time.perf_counter()
+            try:
+                with track_model_time() as timings:
+                    qa(query)
+            except Exception as e:
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+                continue
+            with lock:
+                samples.append((time.perf_counter() - started, sum(timings), len(timings)))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(agents)) as pool:
+        list(pool.map(worker, agents))
+    return samples, errors, time.perf_counter() - started
+
+
+def run_async(agents: list, queries: list, requests: int, track_model_time) -> tuple:
+    """Concurrent ``ainvoke`` calls on one event loop, one agent per in-flight request."""
+    samples, errors = [], []
+
+    async def one(i: int, free: asyncio.Queue):
+        qa = await free.get()
+        started = time.perf_counter()
+        try:
+            with track_model_time() as timings:
+                await qa.ainvoke(queries[i % len(queries)])
+            samples.append((time.perf_counter() - started, sum(timings), len(timings)))
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+        finally:
+            free.put_nowait(qa)
+
+    async def main():
+        free = asyncio.Queue()
+        for qa in agents:
+            free.put_nowait(qa)
+        await asyncio.gather(*(one(i, free) for i in range(requests)))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    return samples, errors, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of the HR agent's query path.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--replay", metavar="CASSETTE", help="Answer every model call from a recording")
+    source.add_argument("--record", metavar="CASSETTE", help="Record model calls while testing")
+    parser.add_argument("--real-api", action="store_true", help="Use OPENAI_BASE_URL/the real API instead of the fake server")
+    parser.add_argument("--latency-ms", type=float, default=300, help="Fake server chat time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50, help="Fake server streaming throughput")
+    parser.add_argument("--embedding-latency-ms", type=float, default=20, help="Fake server embedding latency")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the semantic answer cache enabled")
+    parser.add_argument("--qa", default=DEFAULT_QA_PATH, help="JSON list of {question, ...} items to ask")
+    parser.add_argument("--docs", nargs="+", default=DEFAULT_DOCS, help="Policy documents to index")
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    with open(args.qa, "r", encoding="utf-8") as f:
+        queries = [item["question"] for item in json.load(f)]
+
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    server = configure(args, workdir)
+    try:
+        import rag_backend
+        from openai_replay import track_model_time
+
+        # The index is built through the same (fake, recorded or replayed) embedding endpoint.
+        if rag_backend.build_vector_db(args.docs) is None:
+            raise RuntimeError(f"No documents could be indexed from {args.docs}.")
+        vectordb = rag_backend.load_vector_db()
+        agents = [rag_backend.get_qa_chain(vectordb) for _ in range(args.concurrency)]
+
+        run = run_async if args.mode == "async" else run_sync
+        samples, errors, wall_seconds = run(agents, queries, args.requests, track_model_time)
+        report = summarize(samples, errors, wall_seconds)
+    finally:
+        if server is not None:
+            server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
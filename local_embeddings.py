@@ -0,0 +1,49 @@
+# local_embeddings.py
+
+import hashlib
+import math
+import re
+from collections import Counter
+
+from langchain_core.embeddings import Embeddings
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic, offline stand-in for the OpenAI embedder.
+
+    Word unigrams and bigrams are hashed into a fixed number of signed
+    dimensions with log-scaled counts, then L2-normalized. Texts that share
+    words land close together, which is enough to benchmark and exercise the
+    retrieval pipeline without network access or API keys. It is not a
+    substitute for a real model when judging answer quality.
+    """
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+        self.model_name = f"local-hashing-{dimensions}"
+
+    def _features(self, text: str) -> Counter:
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        return Counter(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+    def _embed(self, text: str) -> list:
+        vector = [0.0] * self.dimensions
+        for feature, count in self._features(text).items():
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[index] += sign * (1.0 + math.log(count))
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: list) -> list:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: list) -> list:
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list:
+        return self.embed_query(text)
@@ -0,0 +1,62 @@
+# local_http_server.py
+#
+# Shared scaffolding for the local stand-in servers used by the offline load tests
+# (fake_openai_server.py, mock_hris_server.py).
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class JSONRequestHandler(BaseHTTPRequestHandler):
+    """Quiet keep-alive HTTP/1.1 handler with JSON request/response helpers."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; with Nagle's algorithm on, each
+    # keep-alive response waits ~40 ms for the client's delayed ACK.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    @staticmethod
+    def error_payload(message: str) -> dict:
+        """Error body in the emulated API's format."""
+        return {"error": message}
+
+    def _read_json(self):
+        """Returns the decoded request body, or None after answering 400 if it isn't JSON."""
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, self.error_payload("Invalid JSON body."))
+            return None
+
+
+def start_server(handler_class, host: str, port: int, name: str, **attributes) -> ThreadingHTTPServer:
+    """Starts a threaded server in a daemon thread; ``attributes`` are set on the server for handlers to read."""
+    server = ThreadingHTTPServer((host, port), handler_class)
+    server.daemon_threads = True
+    for key, value in attributes.items():
+        setattr(server, key, value)
+    threading.Thread(target=server.serve_forever, name=name, daemon=True).start()
+    return server
+
+
+def wait_until_interrupted(server: ThreadingHTTPServer):
+    """Blocks the main thread until Ctrl-C, then stops the server."""
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,271 @@
+# mock_hris_server.py
+#
+# Local HRIS stand-in for offline load tests of the HRIS tools: no network, no API key.
+# Run with:  python mock_hris_server.py --port 8002 --employees 5000 --latency-ms 80 --error-rate 0.02
+# Then point the tools at it:  HRIS_MODE=api HRIS_API_URL=http://127.0.0.1:8002/api/v1/
+#
+# Serves GET /balances/{employee_id}, POST /balances/bulk, GET /teams/{manager_id} and
+# POST /requests (the URLs hris_tools calls) from a generated dataset. Latency is
+# log-normal around a median, failures are injected at a fixed rate and a token
+# bucket rate-limits the whole server with 429 + Retry-After.
+# GET /stats reports request, error and rate-limit counts.
+
+import argparse
+import random
+import threading
+import time
+import uuid
+from datetime import date
+
+from local_http_server import JSONRequestHandler, start_server as start_http_server, wait_until_interrupted
+
+LEAVE_TYPES = ("vacation", "sick", "casual")
+# Largest employee_ids list POST /balances/bulk accepts
+MAX_BULK_IDS = 100
+FIRST_NAMES = ("Aisha", "Ben", "Carla", "Dev", "Elena", "Farid", "Grace", "Hiro", "Ines", "Jonas", "Kemi", "Liam")
+LAST_NAMES = ("Patel", "Okafor", "Smith", "Garcia", "Chen", "Novak", "Haddad", "Silva", "Kim", "Murphy")
+
+
+def generate_teams(employee_ids: list, team_size: int, seed: int = 0) -> tuple:
+    """Splits employees into teams of ``team_size`` led by their first member.
+
+    Returns ``(teams, names)``: manager ID -> report IDs, and employee ID -> name.
+    """
+    rng = random.Random(seed)
+    names = {employee_id: f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for employee_id in employee_ids}
+    teams = {}
+    for start in range(0, len(employee_ids), max(team_size, 2)):
+        manager, *reports = employee_ids[start:start + max(team_size, 2)]
+        if reports:
+            teams[manager] = reports
+    return teams, names
+
+
+def generate_employees(count: int, seed: int = 0) -> dict:
+    """``count`` employees E1001, E1002, ... with random balances; E1001 matches the built-in mock."""
+    rng = random.Random(seed)
+    employees = {}
+    for i in range(count):
+        employees[f"E{1001 + i}"] = {
+            "vacation": rng.randint(0, 25),
+            "sick": rng.randint(0, 12),
+            "casual": rng.randint(0, 5),
+        }
+    if employees:
+        employees["E1001"] = {"vacation": 15, "sick": 8, "casual": 3}
+    return employees
+
+
+class MockHRISConfig:
+    def __init__(self, employees: int = 5000, latency_ms: float = 50, latency_sigma: float = 0.5,
+                 error_rate: float = 0.0, error_status: int = 503, rate_limit: float = 0, seed: int = 0,
+                 team_size: int = 8):
+        self.employees = employees
+        # Employees per team, manager included
+        self.team_size = team_size
+        # Median response latency; sigma is the log-normal spread (0: every response takes latency_ms)
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        # Share of requests answered with error_status instead of being processed
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # Requests per second across all clients (0: unlimited); bursts up to one second's worth
+        self.rate_limit = rate_limit
+        self.seed = seed
+
+
+class TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = max(rate, 1.0)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Takes a token; returns 0 on success, else the seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class MockHRISState:
+    """Dataset, fault injection and counters shared by all request threads."""
+
+    def __init__(self, config: MockHRISConfig):
+        self.config = config
+        self.employees = generate_employees(config.employees, config.seed)
+        self.teams, self.names = generate_teams(list(self.employees), config.team_size, config.seed)
+        self.bucket = TokenBucket(config.rate_limit) if config.rate_limit else None
+        self.random = random.Random(config.seed + 1)
+        self.lock = threading.Lock()
+        self.counters = {
+            "requests": 0, "balances": 0, "bulk_balances": 0, "teams": 0,
+            "leave_requests": 0, "injected_errors": 0, "rate_limited": 0,
+        }
+
+    def count(self, name: str):
+        with self.lock:
+            self.counters[name] += 1
+
+    def latency(self) -> float:
+        with self.lock:
+            factor = self.random.lognormvariate(0, self.config.latency_sigma) if self.config.latency_sigma else 1.0
+        return self.config.latency_ms * factor / 1000
+
+    def inject_error(self) -> bool:
+        with self.lock:
+            return self.random.random() < self.config.error_rate
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {**self.counters, "employees": len(self.employees), "teams_total": len(self.teams)}
+
+
+def _leave_days(start_date: str, end_date: str) -> int:
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    if end < start:
+        raise ValueError("end_date is before start_date")
+    return (end - start).days + 1
+
+
+class MockHRISHandler(JSONRequestHandler):
+    @property
+    def state(self) -> MockHRISState:
+        return self.server.state
+
+    def _admit(self) -> bool:
+        """Applies the rate limit, latency and failure injection; False if an error was sent."""
+        self.state.count("requests")
+        if self.state.bucket is not None:
+            wait = self.state.bucket.acquire()
+            if wait:
+                self.state.count("rate_limited")
+                self._send_json(429, {"error": "Rate limit exceeded."}, {"Retry-After": f"{wait:.3f}"})
+                return False
+        time.sleep(self.state.latency())
+        if self.state.inject_error():
+            self.state.count("injected_errors")
+            self._send_json(self.state.config.error_status, {"error": "Injected failure."})
+            return False
+        return True
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path.endswith("/stats"):
+            return self._send_json(200, self.state.stats())
+        if "/teams/" in path:
+            return self._team(path.rsplit("/", 1)[-1])
+        if "/balances/" not in path:
+            return self._send_json(404, {"error": f"Unknown path {self.path}"})
+        if not self._admit():
+            return
+        self.state.count("balances")
+        employee_id = path.rsplit("/", 1)[-1]
+        with self.state.lock:
+            balance = self.state.employees.get(employee_id)
+            balance = dict(balance) if balance is not None else None
+        if balance is None:
+            return self._send_json(404, {"error": f"Employee {employee_id} not found."})
+        self._send_json(200, balance)
+
+    def do_POST(self):
+        payload = self._read_json()
+        if payload is None:
+            return
+        path = self.path.rstrip("/")
+        if path.endswith("/balances/bulk"):
+            return self._bulk_balances(payload)
+        if not path.endswith("/requests"):
+            return self._send_json(404, {"error": f"Unknown path {self.path}"})
+        if not self._admit():
+            return
+        self.state.count("leave_requests")
+        self._submit(payload)
+
+    def _team(self, manager_id: str):
+        if not self._admit():
+            return
+        self.state.count("teams")
+        reports = self.state.teams.get(manager_id)
+        if reports is None:
+            return self._send_json(404, {"error": f"{manager_id} has no direct reports."})
+        self._send_json(200, {
+            "manager_id": manager_id,
+            "members": [{"employee_id": employee_id, "name": self.state.names[employee_id]} for employee_id in reports],
+        })
+
+    def _bulk_balances(self, payload: dict):
+        employee_ids = payload.get("employee_ids")
+        if not isinstance(employee_ids, list) or not employee_ids:
+            return self._send_json(422, {"error": "employee_ids must be a non-empty list."})
+        if len(employee_ids) > MAX_BULK_IDS:
+            return self._send_json(422, {"error": f"At most {MAX_BULK_IDS} employee_ids per request."})
+        if not self._admit():
+            return
+        self.state.count("bulk_balances")
+        with self.state.lock:
+            found = {e: dict(self.state.employees[e]) for e in employee_ids if e in self.state.employees}
+        self._send_json(200, {"balances": found, "not_found": [e for e in employee_ids if e not in found]})
+
+    def _submit(self, payload: dict):
+        employee_id = payload.get("employee_id")
+        leave_type = str(payload.get("leave_type", "")).lower()
+        if leave_type not in LEAVE_TYPES:
+            return self._send_json(422, {"error": f"Unknown leave type {payload.get('leave_type')!r}."})
+        try:
+            days = _leave_days(payload.get("start_date", ""), payload.get("end_date", ""))
+        except (TypeError, ValueError) as e:
+            return self._send_json(422, {"error": f"Invalid dates: {e}."})
+
+        with self.state.lock:
+            balance = self.state.employees.get(employee_id)
+            remaining = balance[leave_type] if balance is not None else None
+            if remaining is not None and remaining >= days:
+                # Approval is pending, but the days are held against the balance straight away
+                balance[leave_type] -= days
+        if remaining is None:
+            return self._send_json(404, {"error": f"Employee {employee_id} not found."})
+        if remaining < days:
+            return self._send_json(409, {"error": f"Insufficient {leave_type} balance ({remaining} days left)."})
+        self._send_json(200, {
+            "status": "success",
+            "request_id": f"LR-{uuid.uuid4().hex[:10]}",
+            "message": f"{leave_type.capitalize()} request for {payload['start_date']} to {payload['end_date']} "
+                       f"({days} day{'s' if days != 1 else ''}) submitted for approval.",
+        })
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, config: MockHRISConfig = None) -> tuple:
+    """Starts the server in a daemon thread; returns ``(server, base_url)``. Port 0 picks a free port."""
+    server = start_http_server(MockHRISHandler, host, port, "mock-hris-server", state=MockHRISState(config or MockHRISConfig()))
+    return server, f"http://{host}:{server.server_address[1]}/api/v1/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock HRIS API with latency, failure and rate-limit injection.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--employees", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Median response latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal latency spread (0: fixed)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--rate-limit", type=float, default=0, help="Requests per second (0: unlimited)")
+    parser.add_argument("--team-size", type=int, default=8, help="Employees per team, manager included")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockHRISConfig(args.employees, args.latency_ms, args.latency_sigma, args.error_rate,
+                            args.error_status, args.rate_limit, args.seed, args.team_size)
+    server, base_url = start_server(args.host, args.port, config)
+    print(f"--- 🏢 Mock HRIS server listening on {base_url} ({args.employees} employees) ---")
+    wait_until_interrupted(server)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# numpy_store.py
+
+import json
+import os
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "numpy_store.json"
+INT8_CODES_FILE = "embeddings.int8.npy"
+INT8_SCALES_FILE = "embeddings.int8_scales.npy"
+BINARY_CODES_FILE = "embeddings.binary.npy"
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+# Candidates taken from the quantized scan per requested result, then re-scored exactly
+QUANTIZED_RESCORE_FACTOR = int(os.getenv("QUANTIZED_RESCORE_FACTOR", "8"))
+# Rows scanned per block, bounding the temporary memory of a quantized scan
+SCAN_BLOCK_ROWS = 65536
+
+# Set bits per byte value, for Hamming distances over packed binary codes
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize_int8(matrix: np.ndarray) -> tuple:
+    """Symmetric per-dimension scalar quantization; returns ``(codes, scales)``."""
+    scales = np.abs(matrix).max(axis=0) / 127.0 if len(matrix) else np.ones(matrix.shape[1], dtype=np.float32)
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scales), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def quantize_binary(matrix: np.ndarray) -> np.ndarray:
+    """Sign quantization, one bit per dimension, packed eight to a byte."""
+    return np.packbits(matrix > 0, axis=-1)
+
+
+def _save_array(index_dir: str, name: str, array: np.ndarray):
+    # np.save appends .npy to names without it, so the temp name keeps the suffix.
+    tmp_path = os.path.join(index_dir, name[:-len(".npy")] + ".tmp.npy")
+    np.save(tmp_path, array)
+    os.replace(tmp_path, os.path.join(index_dir, name))
+
+
+class NumpyVectorStore(VectorStore):
+    """Read-only brute-force vector store over a memory-mapped float32 matrix.
+
+    Embeddings are stored L2-normalized in ``embeddings.npy`` with chunk IDs,
+    texts and metadata in a sidecar JSON file. Loading only maps the file, so
+    it takes milliseconds and the pages are shared by every worker process
+    that opens the same version. Top-k is one matrix-vector product plus
+    ``argpartition``. The store is produced from the Chroma collection by
+    ``export_from_chroma`` at build time.
+
+    If the index was exported with int8 or binary quantization, search is
+    two-stage: the compact codes are scanned for ``rescore_factor * k``
+    candidates, which are then re-scored exactly against the float32 rows.
+    Only those candidate rows of the float32 matrix are ever paged in, so the
+    working set is the size of the codes (4x smaller for int8, 32x for binary).
+    """
+
+    def __init__(self, index_dir: str, embedding_function, mmap: bool = True,
+                 rescore_factor: int = QUANTIZED_RESCORE_FACTOR):
+        self.index_dir = index_dir
+        self.embedding_function = embedding_function
+        self.rescore_factor = rescore_factor
+        mmap_mode = "r" if mmap else None
+        self.matrix = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode=mmap_mode)
+        with open(os.path.join(index_dir, METADATA_FILE), "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+        self.ids = sidecar["ids"]
+        self.texts = sidecar["texts"]
+        self.metadatas = sidecar["metadatas"]
+        self.quantization = sidecar.get("quantization", "none")
+        if self.quantization == "int8":
+            self.codes = np.load(os.path.join(index_dir, INT8_CODES_FILE), mmap_mode=mmap_mode)
+            self.scales = np.load(os.path.join(index_dir, INT8_SCALES_FILE))
+        elif self.quantization == "binary":
+            self.codes = np.load(os.path.join(index_dir, BINARY_CODES_FILE), mmap_mode=mmap_mode)
+
+    @staticmethod
+    def exists(index_dir: str) -> bool:
+        return all(os.path.exists(os.path.join(index_dir, name)) for name in (EMBEDDINGS_FILE, METADATA_FILE))
+
+    @property
+    def embeddings(self):
+        return self.embedding_function
+
+    @staticmethod
+    def _best(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the ``k`` highest scores, best first."""
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def _approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        """Scores every row from the quantized codes; higher is closer."""
+        if self.quantization == "int8":
+            # Folding the scales into the query keeps the scan to one product per block.
+            weights = query * self.scales
+            score_block = lambda block: block.astype(np.float32) @ weights
+        else:
+            query_bits = quantize_binary(query)
+            score_block = lambda block: -_POPCOUNT[np.bitwise_xor(block, query_bits)].sum(axis=1, dtype=np.int32)
+        n_rows = self.codes.shape[0]
+        return np.concatenate([
+            score_block(self.codes[start:start + SCAN_BLOCK_ROWS])
+            for start in range(0, n_rows, SCAN_BLOCK_ROWS)
+        ])
+
+    def _top_k(self, embedding, k: int, exact: bool = False) -> list:
+        """Returns ``(row, cosine similarity)`` pairs for the ``k`` nearest rows, best first."""
+        n_rows = self.matrix.shape[0]
+        if n_rows == 0:
+            return []
+        # A copy: the caller's vector must not be normalized in place
+        query = np.array(embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        if exact or self.quantization == "none":
+            scores = self.matrix @ query
+            return [(int(row), float(scores[row])) for row in self._best(scores, k)]
+
+        candidates = np.sort(self._best(self._approximate_scores(query), k * self.rescore_factor))
+        scores = self.matrix[candidates] @ query
+        return [(int(candidates[i]), float(scores[i])) for i in self._best(scores, k)]
+
+    def _document(self, row: int) -> Document:
+        return Document(page_content=self.texts[row], metadata=self.metadatas[row], id=self.ids[row])
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs) -> list:
+        return [self._document(row) for row, _ in self._top_k(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs) -> list:
+        embedding = self.embedding_function.embed_query(query)
+        return [(self._document(row), score) for row, score in self._top_k(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> list:
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k)
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError("NumpyVectorStore is read-only; rebuild the index to add documents.")
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("Use NumpyVectorStore.export_from_chroma() to create a NumPy index.")
+
+    @staticmethod
+    def export_from_chroma(db, index_dir: str, quantization: str = "none"):
+        """Writes every chunk of a Chroma collection as a normalized float32 matrix plus sidecar.
+
+        ``quantization`` (``"none"``, ``"int8"`` or ``"binary"``) additionally
+        writes the compact codes used for the first search stage.
+        """
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization {quantization!r}; expected one of {QUANTIZATION_MODES}.")
+        stored = db.get(include=["embeddings", "documents", "metadatas"])
+        embeddings = stored["embeddings"]
+        if embeddings is None or len(embeddings) == 0:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        else:
+            matrix = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+
+        _save_array(index_dir, EMBEDDINGS_FILE, matrix)
+        if quantization == "int8":
+            codes, scales = quantize_int8(matrix)
+            _save_array(index_dir, INT8_CODES_FILE, codes)
+            _save_array(index_dir, INT8_SCALES_FILE, scales)
+        elif quantization == "binary":
+            _save_array(index_dir, BINARY_CODES_FILE, quantize_binary(matrix))
+
+        sidecar_path = os.path.join(index_dir, METADATA_FILE)
+        with open(sidecar_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({
+                "quantization": quantization,
+                "ids": list(stored["ids"]),
+                "texts": list(stored["documents"]),
+                "metadatas": [metadata or {} for metadata in stored["metadatas"]],
+            }, f)
+        os.replace(sidecar_path + ".tmp", sidecar_path)
+
+        # Codes copied over from a previous version with another mode are dead weight.
+        in_use = {"int8": (INT8_CODES_FILE, INT8_SCALES_FILE), "binary": (BINARY_CODES_FILE,)}.get(quantization, ())
+        remove_numpy_index(index_dir, keep=(EMBEDDINGS_FILE, METADATA_FILE) + in_use)
+        print(f"Exported {matrix.shape[0]} vectors to the NumPy index in {index_dir} (quantization: {quantization})")
+
+
+def remove_numpy_index(index_dir: str, keep: tuple = ()):
+    """Deletes the NumPy index files in ``index_dir`` except those named in ``keep``."""
+    for name in (EMBEDDINGS_FILE, METADATA_FILE, INT8_CODES_FILE, INT8_SCALES_FILE, BINARY_CODES_FILE):
+        if name not in keep and os.path.exists(os.path.join(index_dir, name)):
+            os.remove(os.path.join(index_dir, name))
+
+
+def measure_recall(store: NumpyVectorStore, k: int = 10, sample: int = 200, seed: int = 0) -> dict:
+    """Recall@k of the store's (quantized) search against exact float32 search.
+
+    Stored vectors, lightly perturbed so they are not trivially their own
+    nearest neighbour, stand in for queries.
+    """
+    n_rows = store.matrix.shape[0]
+    if n_rows == 0:
+        return {"quantization": store.quantization, "k": k, "queries": 0, "recall": None}
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(n_rows, size=min(sample, n_rows), replace=False)
+    queries = np.asarray(store.matrix[np.sort(rows)], dtype=np.float32)
+    queries = queries + rng.normal(scale=0.5 / np.sqrt(queries.shape[1]), size=queries.shape).astype(np.float32)
+    k = min(k, n_rows)
+    hits = 0
+    for query in queries:
+        exact = {row for row, _ in store._top_k(query, k, exact=True)}
+        hits += len(exact & {row for row, _ in store._top_k(query, k)})
+    return {
+        "quantization": store.quantization,
+        "k": k,
+        "queries": len(queries),
+        "rescore_factor": store.rescore_factor,
+        "recall": round(hits / (k * len(queries)), 4),
+    }
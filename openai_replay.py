@@ -0,0 +1,234 @@
+# openai_replay.py
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+from collections import defaultdict
+from contextlib import contextmanager
+
+import httpx
+
+# "off": plain SDK clients; "passthrough": real calls, timed; "record": real calls,
+# timed and saved to the cassette; "replay": answered from the cassette, no network
+CASSETTE_MODES = ("off", "passthrough", "record", "replay")
+
+# Hop-by-hop and encoding headers no longer describe the stored, decoded body
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+_model_timings = contextvars.ContextVar("model_timings", default=None)
+
+
+@contextmanager
+def track_model_time():
+    """Collects the duration (seconds) of every model HTTP call made in this context.
+
+    Calls made from threads or tasks started inside the block are included, as
+    long as they copy the context (LangChain and asyncio both do).
+    """
+    timings = []
+    token = _model_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _model_timings.reset(token)
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+def request_key(request: httpx.Request) -> str:
+    """Identifies a request by method, path and canonical JSON body (host and headers are ignored)."""
+    body = request.content
+    try:
+        canonical = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        canonical = body.decode("utf-8", "replace")
+    return hashlib.sha256(f"{request.method} {request.url.path}\n{canonical}".encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Recorded OpenAI HTTP interactions in a JSONL file, one per line.
+
+    A request recorded several times is replayed in recording order; once the
+    recordings run out the last one is repeated, so a short recording can
+    drive a long load test.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._responses = defaultdict(list)
+        self._served = defaultdict(int)
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._responses[entry["key"]].append(entry["response"])
+
+    def __len__(self) -> int:
+        return sum(len(responses) for responses in self._responses.values())
+
+    def replay(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request)
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                raise CassetteMiss(f"No recording for {request.method} {request.url.path} (key {key[:12]}) in {self.path}")
+            served = self._served[key]
+            self._served[key] = served + 1
+            entry = responses[min(served, len(responses) - 1)]
+        return httpx.Response(
+            entry["status"], headers=entry["headers"], content=entry["body"].encode("utf-8"), request=request
+        )
+
+    def record(self, request: httpx.Request, response: httpx.Response):
+        """Stores a response whose body has already been read."""
+        entry = {
+            "status": response.status_code,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS},
+            "body": response.content.decode("utf-8", "replace"),
+        }
+        key = request_key(request)
+        line = json.dumps({
+            "key": key,
+            "request": {"method": request.method, "path": request.url.path, "body": request.content.decode("utf-8", "replace")},
+            "response": entry,
+        })
+        with self._lock:
+            self._responses[key].append(entry)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class _TimedStream(httpx.SyncByteStream):
+    """Ends a call's timing when its (possibly streamed) body has been consumed."""
+
+    def __init__(self, stream, started: float, timings: list):
+        self._stream = stream
+        self._started = started
+        self._timings = timings
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        self._stream.close()
+        self._timings.append(time.perf_counter() - self._started)
+
+
+class _AsyncTimedStream(httpx.AsyncByteStream):
+    def __init__(self, stream, started: float, timings: list):
+        self._stream = stream
+        self._started = started
+        self._timings = timings
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        await self._stream.aclose()
+        self._timings.append(time.perf_counter() - self._started)
+
+
+def _timed_response(request, response, stream_cls, started: float, timings: list) -> httpx.Response:
+    if timings is None:
+        return response
+    if response.is_stream_consumed:
+        # Recorded: the body is already read and decoded.
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS}
+        stream = httpx.ByteStream(response.content)
+    else:
+        headers, stream = response.headers, response.stream
+    return httpx.Response(
+        response.status_code,
+        headers=headers,
+        stream=stream_cls(stream, started, timings),
+        request=request,
+        extensions=response.extensions,
+    )
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """httpx transport for the OpenAI clients that times, records or replays calls.
+
+    One instance is shared by every client in the process, so closing a
+    client leaves it open.
+    """
+
+    def __init__(self, mode: str, cassette: Cassette = None):
+        self.mode = mode
+        self.cassette = cassette
+        self._transport = httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        timings = _model_timings.get()
+        if self.mode == "replay":
+            response = self.cassette.replay(request)
+        else:
+            response = self._transport.handle_request(request)
+            if self.mode == "record":
+                response.read()
+                self.cassette.record(request, response)
+        return _timed_response(request, response, _TimedStream, started, timings)
+
+    def close(self):
+        pass
+
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of ``CassetteTransport``.
+
+    Connection pools are bound to the event loop that opened them, so real
+    calls use one inner transport per loop.
+    """
+
+    def __init__(self, mode: str, cassette: Cassette = None):
+        self.mode = mode
+        self.cassette = cassette
+        self._transports = weakref.WeakKeyDictionary()
+
+    def _loop_transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        transport = self._transports.get(loop)
+        if transport is None:
+            transport = self._transports[loop] = httpx.AsyncHTTPTransport()
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        timings = _model_timings.get()
+        if self.mode == "replay":
+            response = self.cassette.replay(request)
+        else:
+            response = await self._loop_transport().handle_async_request(request)
+            if self.mode == "record":
+                await response.aread()
+                self.cassette.record(request, response)
+        return _timed_response(request, response, _AsyncTimedStream, started, timings)
+
+    async def aclose(self):
+        pass
+
+
+def make_transports(mode: str, cassette_path: str) -> tuple:
+    """Returns ``(sync, async)`` transports for the OpenAI clients, or ``(None, None)`` when mode is "off"."""
+    if mode not in CASSETTE_MODES:
+        raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {CASSETTE_MODES}.")
+    if mode == "off":
+        return None, None
+    cassette = Cassette(cassette_path) if mode in ("record", "replay") else None
+    if mode == "replay":
+        print(f"--- 📼 Replaying {len(cassette)} recorded OpenAI responses from {cassette_path} ---")
+    return CassetteTransport(mode, cassette), AsyncCassetteTransport(mode, cassette)
@@ -0,0 +1,181 @@
+# pdf_ingest.py
+
+import os
+import queue
+import hashlib
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
+
+# This module is imported by pool worker processes, so it must stay free of
+# API-key checks and other import-time side effects.
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0")) or (os.cpu_count() or 1)
+# Non-PDF files are only read as text with one of these extensions, or from the
+# bundled sample policies (whose sample "PDF" is plain text)
+TEXT_EXTENSIONS = (".txt", ".md")
+SAMPLE_POLICY_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "sample_policies")
+
+
+def file_fingerprint(path: str) -> str:
+    """Returns the SHA-256 of a file's bytes, read in blocks so large PDFs stay cheap."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def assign_chunk_ids(chunks: list) -> list:
+    """Derives a stable ID for each chunk from its source, page and text.
+
+    Unchanged pages always produce the same IDs, so they are never re-embedded.
+    Identical chunks on the same page get an occurrence suffix to stay unique.
+    """
+    ids = []
+    seen = {}
+    for chunk in chunks:
+        key = "|".join([
+            str(chunk.metadata.get("source", "")),
+            str(chunk.metadata.get("page", "")),
+            chunk.page_content,
+        ])
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        seen[digest] = seen.get(digest, 0) + 1
+        ids.append(f"{digest}-{seen[digest]}")
+    return ids
+
+
+def _is_text_document(path: str) -> bool:
+    if path.lower().endswith(TEXT_EXTENSIONS):
+        return True
+    resolved = os.path.realpath(path)
+    return os.path.commonpath([resolved, SAMPLE_POLICY_DIR]) == SAMPLE_POLICY_DIR
+
+
+def load_pages(path: str) -> list:
+    """Loads a PDF page by page; .txt/.md files and the bundled plain-text sample policy become a single page."""
+    with open(path, "rb") as f:
+        is_pdf = f.read(5) == b"%PDF-"
+    if is_pdf:
+        return PyPDFLoader(path).load()
+    if not _is_text_document(path):
+        raise ValueError(f"{path} is not a PDF file.")
+    with open(path, "r", encoding="utf-8") as f:
+        return [Document(page_content=f.read(), metadata={"source": path, "page": 0})]
+
+
+def load_and_split_pdf(path: str, chunk_size: int, chunk_overlap: int) -> tuple:
+    """Loads a single PDF, splits its pages into chunks and assigns chunk IDs.
+
+    Runs inside a pool worker, so it only takes and returns picklable values.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+    )
+    chunks = text_splitter.split_documents(load_pages(path))
+    return chunks, assign_chunk_ids(chunks)
+
+
+def parse_pdfs(pdf_paths: list, chunk_size: int, chunk_overlap: int, workers: int = None):
+    """Parses and chunks PDFs concurrently, yielding ``(path, chunks, ids, error)``.
+
+    Results are yielded in the same order as ``pdf_paths`` regardless of which
+    worker finishes first, so the index is built deterministically. A failure in
+    one file is reported through ``error`` and never affects the others. At most
+    ``2 * workers`` files are in flight at once to keep memory bounded.
+    """
+    workers = workers or INGEST_WORKERS
+
+    if workers <= 1 or len(pdf_paths) <= 1:
+        for path in pdf_paths:
+            try:
+                chunks, ids = load_and_split_pdf(path, chunk_size, chunk_overlap)
+                yield path, chunks, ids, None
+            except Exception as e:
+                yield path, [], [], e
+        return
+
+    # Spawned, not forked: this runs on a background thread of a process that
+    # also hosts server and index-worker threads, and fork-after-threads can deadlock.
+    spawn = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(pdf_paths)), mp_context=spawn) as pool:
+        pending = deque()
+        paths = iter(pdf_paths)
+
+        def submit_next():
+            path = next(paths, None)
+            if path is not None:
+                pending.append((path, pool.submit(load_and_split_pdf, path, chunk_size, chunk_overlap)))
+
+        for _ in range(2 * workers):
+            submit_next()
+
+        while pending:
+            path, future = pending.popleft()
+            try:
+                chunks, ids = future.result()
+                yield path, chunks, ids, None
+            except Exception as e:
+                yield path, [], [], e
+            submit_next()
+
+
+class _ProducerError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_DONE = object()
+
+
+def prefetch(iterable, maxsize: int):
+    """Consumes ``iterable`` in a background thread, handing items over through a bounded queue.
+
+    The producer blocks once ``maxsize`` items are waiting, so a slow consumer
+    (embedding/upserting) applies backpressure to a fast one (parsing). Errors
+    raised by the producer are re-raised in the consumer.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_ProducerError(e))
+        finally:
+            put(_DONE)
+
+    producer = threading.Thread(target=produce, name="ingest-producer", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _ProducerError):
+                raise item.error
+            yield item
+    finally:
+        # Unblocks the producer if the consumer stops early.
+        stop.set()
+        producer.join()
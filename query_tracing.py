@@ -0,0 +1,277 @@
+# query_tracing.py
+
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Comma-separated span exporters: "jsonl" (one span per line in TRACE_JSONL_PATH)
+# and/or "otel" (re-emitted through the global OpenTelemetry tracer provider)
+TRACE_EXPORTERS = [name.strip() for name in os.getenv("TRACE_EXPORTERS", "").split(",") if name.strip()]
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", "db/traces.jsonl")
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+_export_lock = threading.Lock()
+
+
+class Span:
+    """One timed stage of a query, shaped after the OpenTelemetry span data model."""
+
+    def __init__(self, trace_id: str, name: str, parent_span_id: str = None, attributes: dict = None):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start_time_unix_nano = time.time_ns()
+        self.end_time_unix_nano = None
+        self.status = "OK"
+        self.status_message = None
+        self._started = time.perf_counter()
+        self.duration_ms = None
+
+    def set_error(self, error: BaseException):
+        self.status = "ERROR"
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        if self.end_time_unix_nano is None:
+            self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+            self.end_time_unix_nano = self.start_time_unix_nano + int(self.duration_ms * 1e6)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_time_unix_nano,
+            "end_time_unix_nano": self.end_time_unix_nano,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.status_message},
+        }
+
+
+class Trace:
+    """All spans of one query, rooted at a span covering its total wall time.
+
+    LangChain run IDs are mapped to spans so callback events and manual spans
+    opened inside a run (see ``span``) attach to the right parent.
+    """
+
+    def __init__(self, name: str = "query", **attributes):
+        self.trace_id = secrets.token_hex(16)
+        self.spans = []
+        self.runs = {}
+        self._lock = threading.Lock()
+        self.root = self.start_span(name, None, attributes)
+
+    def start_span(self, name: str, parent: Span = None, attributes: dict = None) -> Span:
+        span = Span(self.trace_id, name, parent.span_id if parent else None, attributes)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def context(self) -> contextvars.Context:
+        """A copy of the current context with this trace active, for use with ``Context.run``."""
+        context = contextvars.copy_context()
+        context.run(_current_trace.set, self)
+        context.run(_current_span.set, self.root)
+        return context
+
+    def finish(self, error: BaseException = None):
+        if self.root.end_time_unix_nano is not None:
+            return
+        if error is not None:
+            self.root.set_error(error)
+        self.root.end()
+        export_trace(self)
+
+    def summary(self) -> dict:
+        """Total milliseconds per span name, e.g. ``{"query": 812.4, "llm": 640.2, ...}``."""
+        totals = {}
+        for span in self.spans:
+            if span.duration_ms is not None:
+                totals[span.name] = round(totals.get(span.name, 0.0) + span.duration_ms, 3)
+        return totals
+
+
+@contextmanager
+def trace_query(name: str = "query", **attributes):
+    """Traces everything run inside the block as one query; exports it on exit."""
+    trace = Trace(name, **attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    error = None
+    try:
+        yield trace
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        trace.finish(error)
+
+
+@contextmanager
+def span(name: str, run_id=None, **attributes):
+    """Times a stage of the current query; a no-op when no query is being traced.
+
+    ``run_id`` (a LangChain run's ID) nests the span under that run's span.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = trace.runs.get(run_id) or _current_span.get()
+    current = trace.start_span(name, parent, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+def _token_usage(response) -> dict:
+    """Input/output token counts from an LLMResult, streamed or not."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return {"llm.input_tokens": usage.get("input_tokens"), "llm.output_tokens": usage.get("output_tokens")}
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return {"llm.input_tokens": usage.get("prompt_tokens"), "llm.output_tokens": usage.get("completion_tokens")}
+    return {}
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Turns agent callback events into spans of the current trace.
+
+    The agent run, each LLM turn (with time to first token and token counts),
+    each tool call and each retriever run become spans; intermediate chains
+    are folded into their parent. Events outside a traced query are ignored.
+    """
+
+    def _start(self, name: str, run_id, parent_run_id, attributes: dict):
+        trace = _current_trace.get()
+        if trace is None:
+            return
+        parent = trace.runs.get(parent_run_id) or trace.root
+        trace.runs[run_id] = trace.start_span(name, parent, attributes)
+
+    def _end(self, run_id, attributes: dict = None, error: BaseException = None):
+        trace = _current_trace.get()
+        current = trace.runs.get(run_id) if trace else None
+        if current is None or current.end_time_unix_nano is not None:
+            return
+        current.attributes.update(attributes or {})
+        if error is not None:
+            current.set_error(error)
+        current.end()
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        trace = _current_trace.get()
+        if trace is None:
+            return
+        if parent_run_id is None:
+            self._start("agent", run_id, None, {})
+        else:
+            # Prompt/parser plumbing: let its children attach to the enclosing span
+            trace.runs[run_id] = trace.runs.get(parent_run_id) or trace.root
+
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is None:
+            self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is None:
+            self._end(run_id, error=error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        self._start("llm", run_id, parent_run_id, {
+            "llm.model": params.get("model_name") or params.get("model"),
+            "llm.messages": sum(len(batch) for batch in messages),
+        })
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start("llm", run_id, parent_run_id, {"llm.prompts": len(prompts)})
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        trace = _current_trace.get()
+        current = trace.runs.get(run_id) if trace else None
+        if current is not None and "llm.time_to_first_token_ms" not in current.attributes:
+            current.attributes["llm.time_to_first_token_ms"] = round((time.perf_counter() - current._started) * 1000, 3)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id, _token_usage(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name", "tool")
+        self._start(f"tool.{name}", run_id, parent_run_id, {"tool.name": name, "tool.input_chars": len(input_str or "")})
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id, {"tool.output_chars": len(str(output))})
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs):
+        self._start("retriever", run_id, parent_run_id, {})
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id, {"retriever.documents": len(documents)})
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+
+def _export_otel(trace: Trace):
+    from opentelemetry import trace as otel_trace
+
+    tracer = otel_trace.get_tracer("hr-assistant")
+    emitted = {}
+    for current in sorted(trace.spans, key=lambda s: s.start_time_unix_nano):
+        parent = emitted.get(current.parent_span_id)
+        context = otel_trace.set_span_in_context(parent) if parent is not None else None
+        attributes = {k: v for k, v in current.attributes.items() if v is not None}
+        attributes["hr.trace_id"] = trace.trace_id
+        otel_span = tracer.start_span(current.name, context=context, attributes=attributes,
+                                      start_time=current.start_time_unix_nano)
+        if current.status == "ERROR":
+            otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, current.status_message))
+        otel_span.end(end_time=current.end_time_unix_nano or time.time_ns())
+        emitted[current.span_id] = otel_span
+
+
+def export_trace(trace: Trace):
+    """Sends a finished trace to every exporter in ``TRACE_EXPORTERS``; failures never affect the query."""
+    try:
+        if "jsonl" in TRACE_EXPORTERS:
+            lines = "".join(json.dumps(s.to_dict(), default=str) + "\n" for s in trace.spans)
+            with _export_lock:
+                directory = os.path.dirname(TRACE_JSONL_PATH)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(TRACE_JSONL_PATH, "a", encoding="utf-8") as f:
+                    f.write(lines)
+        if "otel" in TRACE_EXPORTERS:
+            _export_otel(trace)
+    except Exception as e:
+        print(f"Trace export failed: {e}")
@@ -1,22 +1,22 @@
 # rag_backend.py
 
 import os
+import json
+import time
 import shutil 
+import httpx
 from dotenv import load_dotenv
 
 # --- CORE LANGCHAIN IMPORTS (Modularized and Corrected) ---
-# Text Splitter
-from langchain_text_splitters import RecursiveCharacterTextSplitter 
-# Loaders/Utilities
-from langchain_community.document_loaders import PyPDFLoader
+# Vector Store (PDF loading and splitting live in pdf_ingest.py)
 from langchain_community.vectorstores import Chroma
 # OpenAI Components
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from langchain_openai import ChatOpenAI
 
 # --- AGENT AND CORE RUNNABLES IMPORTS ---
 # AgentExecutor, Tool, and Prompts are consistently under langchain_core
 from langchain_core.agents import AgentExecutor 
-from langchain_core.tools import Tool 
+from langchain_core.tools import Tool, StructuredTool
 from langchain_core.prompts import ChatPromptTemplate
 # Other core runnables
 from langchain_core.runnables import RunnablePassthrough
@@ -28,71 +28,380 @@ from langchain.agents import create_openai_tools_agent
 
 # --- HRIS TOOLS IMPORT ---
 # IMPORTANT: Ensure your hris_tools.py file has these functions defined!
-from hris_tools import check_pto_balance, submit_leave_request 
+from hris_tools import HRIS_TOOL_MAP, HRIS_ASYNC_TOOL_MAP
+from embedding_cache import CachedEmbeddings, QueryEmbeddingCache
+from ttl_cache import LRUTTLCache
+from answer_cache import SemanticAnswerCache, is_personal_query
+from embedding_scheduler import BatchedEmbeddings
+from local_embeddings import HashingEmbeddings
+from pdf_ingest import file_fingerprint, parse_pdfs, prefetch
+from agent_streaming import stream_executor
+from retrievers import VectorStoreRetriever, HybridRetriever
+from lexical_index import BM25Index
+from numpy_store import NumpyVectorStore, QUANTIZATION_MODES, measure_recall, remove_numpy_index
+from intent_router import IntentRouter
+from openai_replay import make_transports
+from query_tracing import Trace, TracingCallbackHandler, span, trace_query
 
 # --- 1. Configuration ---
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Optional OpenAI-compatible endpoint (e.g. a local stub server for testing)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
 CHROMA_PATH = os.getenv("CHROMA_PATH", "db/hr_policy_embeddings")
 LLM_MODEL = "gpt-4-turbo-2024-04-09" # Recommended model for tool use
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+# "openai", or "hashing" for a deterministic offline embedder (benchmarks, no network)
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")
+# Kept outside CHROMA_PATH so it survives a full rebuild of the vector DB
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "db/embedding_cache.sqlite3")
+# Embedding request scheduling: tokens and inputs per request, concurrent requests
+EMBED_REQUEST_TOKENS = int(os.getenv("EMBED_REQUEST_TOKENS", "20000"))
+EMBED_REQUEST_SIZE = int(os.getenv("EMBED_REQUEST_SIZE", "256"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+# In-memory LRU of query embeddings used by the retriever (entries, seconds)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+# "chroma" or "numpy" (memory-mapped brute-force index exported from Chroma at build time)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+# "none", "int8" or "binary" codes for the NumPy index's first search stage (implies a NumPy export)
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+# "hybrid" fuses BM25 and vector rankings; "vector" is dense similarity only
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# Policy chunks returned to the agent per retriever call
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", "3"))
+# Mock employee used for personalized queries until the UI passes a real session user
+DEFAULT_EMPLOYEE_ID = "E1001"
+# Semantic answer cache for policy questions (cosine similarity threshold, entries)
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+# Record/replay of OpenAI HTTP calls: "off", "passthrough" (timed only), "record" or "replay"
+OPENAI_CASSETTE_MODE = os.getenv("OPENAI_CASSETTE_MODE", "off")
+OPENAI_CASSETTE_PATH = os.getenv("OPENAI_CASSETTE_PATH", "db/openai_cassette.jsonl")
 
 if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY is not set. Please check your .env file.")
+    # Only the real API needs a key; replays, local model servers and offline embeddings don't.
+    if OPENAI_CASSETTE_MODE == "replay" or OPENAI_BASE_URL or EMBEDDING_PROVIDER == "hashing":
+        OPENAI_API_KEY = "not-needed"
+    else:
+        raise ValueError("OPENAI_API_KEY is not set. Please check your .env file.")
+
+# Shared across agent rebuilds so entries and hit-rate metrics survive index swaps
+QUERY_EMBEDDING_CACHE = LRUTTLCache(maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+SEMANTIC_ANSWER_CACHE = SemanticAnswerCache(threshold=ANSWER_CACHE_THRESHOLD, maxsize=ANSWER_CACHE_SIZE)
+INTENT_ROUTER = IntentRouter()
+OPENAI_HTTP_TRANSPORT, OPENAI_ASYNC_HTTP_TRANSPORT = make_transports(OPENAI_CASSETTE_MODE, OPENAI_CASSETTE_PATH)
 
 # --- 2. Core Vector DB Functions ---
 
-def build_vector_db(pdf_paths: list):
-    """Loads PDFs, chunks the text, creates embeddings, and saves them to ChromaDB."""
+def get_query_cache_stats() -> dict:
+    """Returns size, hits, misses and hit rate of the query-embedding LRU."""
+    return QUERY_EMBEDDING_CACHE.stats()
+
+
+def get_embeddings():
+    """Returns the batched OpenAI embedder wrapped in the persistent on-disk embedding cache."""
+    if EMBEDDING_PROVIDER == "hashing":
+        return HashingEmbeddings()
+    return CachedEmbeddings(
+        BatchedEmbeddings(
+            model=EMBEDDING_MODEL,
+            api_key=OPENAI_API_KEY,
+            base_url=OPENAI_BASE_URL,
+            max_batch_tokens=EMBED_REQUEST_TOKENS,
+            max_batch_size=EMBED_REQUEST_SIZE,
+            max_concurrency=EMBED_CONCURRENCY,
+            http_transport=OPENAI_HTTP_TRANSPORT,
+            async_http_transport=OPENAI_ASYNC_HTTP_TRANSPORT,
+        ),
+        model_name=EMBEDDING_MODEL,
+        cache_path=EMBEDDING_CACHE_PATH,
+    )
+
+
+MANIFEST_FILE = "index_manifest.json"
+# Each build goes into CHROMA_PATH/versions/<version>; CURRENT names the one being served
+VERSIONS_DIR = "versions"
+CURRENT_POINTER_FILE = "CURRENT"
+INDEX_KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", "2"))
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "100"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "1024"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+
+
+def _load_manifest(index_dir: str) -> dict:
+    """Reads an index version's manifest (file fingerprints and chunk IDs) if one exists."""
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(index_dir: str, manifest: dict):
+    """Writes the manifest atomically so a crash never leaves a half-written file."""
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def get_index_version():
+    """Returns the index version currently being served, or None if none has been built.
+
+    Callers cache loaded vector stores and agents under this version; it changes
+    on every rebuild that changes the index, which invalidates those caches.
+    """
+    pointer_path = os.path.join(CHROMA_PATH, CURRENT_POINTER_FILE)
+    if not os.path.exists(pointer_path):
+        return None
+    with open(pointer_path, "r", encoding="utf-8") as f:
+        return f.read().strip() or None
+
+
+def get_index_dir(version: str = None):
+    """Returns the directory of ``version`` (default: the current one), or None."""
+    version = version or get_index_version()
+    if version is None:
+        return None
+    return os.path.join(CHROMA_PATH, VERSIONS_DIR, version)
+
+
+def _promote_index_version(version: str):
+    """Atomically points CURRENT at a completed build; readers see the old or new version, never neither."""
+    pointer_path = os.path.join(CHROMA_PATH, CURRENT_POINTER_FILE)
+    with open(pointer_path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer_path + ".tmp", pointer_path)
+
+
+def _collect_old_versions():
+    """Deletes all but the newest INDEX_KEEP_VERSIONS versions, never the current one."""
+    versions_root = os.path.join(CHROMA_PATH, VERSIONS_DIR)
+    current = get_index_version()
+    # Version names start with a timestamp, so they sort oldest first.
+    versions = sorted(os.listdir(versions_root))
+    for version in versions[:-max(1, INDEX_KEEP_VERSIONS)]:
+        if version != current:
+            # A reader may still hold files open on Windows; retry on the next build.
+            shutil.rmtree(os.path.join(versions_root, version), ignore_errors=True)
+
+
+def build_vector_db(pdf_paths: list, incremental: bool = False, workers: int = None, progress=None,
+                    quantization: str = None, chunk_size: int = None, chunk_overlap: int = None):
+    """Loads PDFs, chunks the text, creates embeddings, and saves them to ChromaDB.
+
+    Every build writes a fresh version directory and is promoted only once it
+    has completed, so queries keep using the previous version throughout the
+    rebuild and a failed build leaves it untouched. Old versions are
+    garbage-collected after promotion.
+
+    With ``incremental=True`` the new version starts as a copy of the current
+    one; each PDF is fingerprinted and only chunks that are new or changed are
+    embedded, while chunks belonging to edited pages or to PDFs no longer in
+    ``pdf_paths`` are deleted.
+
+    PDFs are parsed and chunked in a process pool of ``workers`` processes
+    (default: ``INGEST_WORKERS`` or the CPU count). Ingestion is streamed:
+    chunks are embedded and upserted in batches of ``EMBED_BATCH_SIZE`` as soon
+    as they are produced, so peak memory does not grow with the corpus size.
+
+    ``progress``, if given, is called with keyword counters (``stage``,
+    ``files_total``, ``files_parsed``, ``chunks_found``, ``chunks_embedded``)
+    as the build advances; it may be called from a background thread.
+
+    ``quantization`` (default: ``VECTOR_QUANTIZATION``) stores int8 or binary
+    codes in the NumPy index for a two-stage search; the build then measures
+    recall against the unquantized index and records it in the manifest.
+
+    ``chunk_size`` and ``chunk_overlap`` default to ``CHUNK_SIZE`` and
+    ``CHUNK_OVERLAP``.
+    """
+    quantization = quantization or VECTOR_QUANTIZATION
+    chunk_size = chunk_size or CHUNK_SIZE
+    chunk_overlap = CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap
+    embeddings = get_embeddings()
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization {quantization!r}; expected one of {QUANTIZATION_MODES}.")
     print("--- 📄 Starting PDF Loading and Chunking ---")
-    documents = []
-    
+    report = progress or (lambda **counters: None)
+    settings = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "embedding_model": embeddings.model_name}
+
+    current_dir = get_index_dir() if incremental else None
+    old_manifest = _load_manifest(current_dir) if current_dir else {}
+    if old_manifest.get("settings") != settings:
+        # Chunking or embedding model changed (or no prior index): nothing can be reused.
+        old_manifest = {}
+    old_files = old_manifest.get("files", {})
+
+    new_files = {}
+
+    # Fingerprinting is cheap, so it stays in this process; only changed files are parsed.
+    to_parse = []
+    fingerprints = {}
     for path in pdf_paths:
         try:
-            if os.path.exists(path):
-                loader = PyPDFLoader(path)
-                documents.extend(loader.load())
-                print(f"Loaded pages from {path}")
-            else:
+            if not os.path.exists(path):
                 print(f"Skipping file: {path} not found.")
+                continue
+
+            fingerprint = file_fingerprint(path)
+            previous = old_files.get(path)
+            if previous and previous["sha256"] == fingerprint:
+                new_files[path] = previous
+                print(f"Unchanged, skipping {path}")
+                continue
+
+            fingerprints[path] = fingerprint
+            to_parse.append(path)
         except Exception as e:
             print(f"Error loading PDF from {path}: {e}")
+            if path in old_files:
+                new_files[path] = old_files[path]
 
-    if not documents:
-        print("No documents loaded successfully.")
-        return None
-        
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=100,
-        length_function=len,
-    )
-    chunks = text_splitter.split_documents(documents)
-    print(f"Total documents split into {len(chunks)} chunks.")
-    
-    embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-    
-    os.makedirs(CHROMA_PATH, exist_ok=True)
-    
-    db = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        persist_directory=CHROMA_PATH 
-    )
-    
-    db.persist()
-    print(f"--- ✅ Vector Store successfully saved to {CHROMA_PATH} ---")
+    files_total = len(pdf_paths)
+    report(stage="parsing", files_total=files_total, files_parsed=files_total - len(to_parse),
+           chunks_found=0, chunks_embedded=0)
+
+    # Nothing added, changed or removed: keep serving the current version rather than
+    # copying it and promoting the copy, which would also drop every version-scoped cache.
+    old_quantization = old_manifest.get("quantization", {}).get("quantization", "none")
+    needs_numpy = VECTOR_BACKEND == "numpy" or quantization != "none"
+    if (old_files and not to_parse and new_files.keys() == old_files.keys() and old_quantization == quantization
+            and needs_numpy == NumpyVectorStore.exists(current_dir)):
+        print(f"--- ✅ No document changes; still serving version {get_index_version()} ---")
+        return Chroma(persist_directory=current_dir, embedding_function=embeddings)
+
+    def chunk_batches():
+        """Yields (chunks, ids) batches of new/changed chunks as files finish parsing."""
+        batch_chunks, batch_ids = [], []
+        files_parsed = files_total - len(to_parse)
+        chunks_found = 0
+        for path, chunks, chunk_ids, error in parse_pdfs(to_parse, chunk_size, chunk_overlap, workers):
+            files_parsed += 1
+            if error is not None:
+                print(f"Error loading PDF from {path}: {error}")
+                if path in old_files:
+                    # Keep serving the last good version of a file that failed to parse.
+                    new_files[path] = old_files[path]
+                report(files_parsed=files_parsed)
+                continue
+
+            previous = old_files.get(path)
+            known_ids = set(previous["chunk_ids"]) if previous else set()
+            for chunk, chunk_id in zip(chunks, chunk_ids):
+                if chunk_id in known_ids:
+                    continue
+                batch_chunks.append(chunk)
+                batch_ids.append(chunk_id)
+                chunks_found += 1
+                if len(batch_chunks) >= EMBED_BATCH_SIZE:
+                    yield batch_chunks, batch_ids
+                    batch_chunks, batch_ids = [], []
+            new_files[path] = {"sha256": fingerprints[path], "chunk_ids": chunk_ids}
+            print(f"Loaded pages from {path}")
+            report(files_parsed=files_parsed, chunks_found=chunks_found)
+        if batch_chunks:
+            yield batch_chunks, batch_ids
+
+    # Sub-second nanoseconds keep names in build order even for back-to-back builds.
+    version = f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 1_000_000_000:09d}"
+    build_dir = get_index_dir(version)
+    if old_files:
+        shutil.copytree(current_dir, build_dir)
+    else:
+        os.makedirs(build_dir)
+
+    try:
+        db = Chroma(
+            persist_directory=build_dir,
+            embedding_function=embeddings
+        )
+        # The BM25 index is maintained alongside the collection and versioned with it
+        lexical_index = BM25Index.load(build_dir) if old_files else None
+        if lexical_index is None:
+            lexical_index = BM25Index.from_vectorstore(db)
+
+        embedded = 0
+        # Parsing runs ahead in a background thread while this thread embeds and
+        # upserts; the bounded queue caps how many batches can pile up in memory.
+        for batch_chunks, batch_ids in prefetch(chunk_batches(), PIPELINE_QUEUE_SIZE):
+            db.add_documents(documents=batch_chunks, ids=batch_ids)
+            lexical_index.add(batch_ids, batch_chunks)
+            embedded += len(batch_chunks)
+            print(f"Embedded and upserted {embedded} chunks so far")
+            report(stage="embedding", chunks_embedded=embedded)
+
+        if not new_files:
+            print("No documents loaded successfully.")
+            shutil.rmtree(build_dir, ignore_errors=True)
+            return None
+
+        live_ids = {chunk_id for entry in new_files.values() for chunk_id in entry["chunk_ids"]}
+        stale_ids = [
+            chunk_id
+            for entry in old_files.values()
+            for chunk_id in entry["chunk_ids"]
+            if chunk_id not in live_ids
+        ]
+        if stale_ids:
+            db.delete(ids=stale_ids)
+            lexical_index.remove(stale_ids)
+        print(f"{embedded} new/changed chunks embedded, {len(stale_ids)} stale chunks deleted.")
+
+        db.persist()
+        lexical_index.save(build_dir)
+        manifest = {"settings": settings, "files": new_files}
+        if needs_numpy:
+            NumpyVectorStore.export_from_chroma(db, build_dir, quantization)
+            if quantization != "none":
+                recall = measure_recall(NumpyVectorStore(build_dir, db.embeddings))
+                print(f"Quantized ({quantization}) search recall@{recall['k']} vs. float32: {recall['recall']}")
+                manifest["quantization"] = recall
+        else:
+            # An incremental copy would otherwise keep serving the previous version's export.
+            remove_numpy_index(build_dir)
+        _save_manifest(build_dir, manifest)
+    except BaseException:
+        # The current version is still intact; just discard the partial build.
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    report(stage="promoting")
+    _promote_index_version(version)
+    _collect_old_versions()
+    print(f"--- ✅ Vector Store successfully saved to {build_dir} (now serving version {version}) ---")
     return db
 
 
-def load_vector_db():
-    """Loads the existing ChromaDB vector store."""
-    if not os.path.exists(CHROMA_PATH) or not os.listdir(CHROMA_PATH):
+def load_vector_db(backend: str = None):
+    """Loads the vector store of the current index version.
+
+    ``backend`` (default: ``VECTOR_BACKEND``, or ``"numpy"`` for a quantized
+    version) selects Chroma or the memory-mapped NumPy index; the latter falls
+    back to Chroma if the version was built without a NumPy export.
+    """
+    index_dir = get_index_dir()
+    if index_dir is None or not os.path.exists(index_dir):
         raise FileNotFoundError(f"Vector DB not found at {CHROMA_PATH}.") 
+    if backend is None:
+        backend = "numpy" if "quantization" in _load_manifest(index_dir) else VECTOR_BACKEND
         
-    embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+    # Repeat questions are answered from the in-memory query cache
+    embedder = get_embeddings()
+    embeddings = QueryEmbeddingCache(embedder, embedder.model_name, QUERY_EMBEDDING_CACHE)
+
+    if backend == "numpy":
+        if NumpyVectorStore.exists(index_dir):
+            db = NumpyVectorStore(index_dir, embeddings)
+            print("--- 💾 NumPy Vector Store memory-mapped successfully ---")
+            return db
+        print(f"No NumPy index in {index_dir}; rebuild with VECTOR_BACKEND=numpy. Falling back to Chroma.")
     
     db = Chroma(
-        persist_directory=CHROMA_PATH, 
+        persist_directory=index_dir, 
         embedding_function=embeddings
     )
     
@@ -101,31 +410,70 @@ def load_vector_db():
 
 # --- 3. Agent Executor Function (get_qa_chain) ---
 
-def get_qa_chain(vectordb: Chroma):
-    """Creates and returns a LangChain Agent Executor (Tool-Enabled Agent)."""
+def get_retriever(vectordb, index_version: str = None, k: int = None, mode: str = None):
+    """Builds the policy retriever behind the agent's ``Policy_Document_Retriever`` tool.
+
+    ``mode`` (default: ``RETRIEVAL_MODE``) is ``"hybrid"`` or ``"vector"``;
+    hybrid falls back to vector search if the version has no lexical index.
+    """
+    k = k or RETRIEVER_K
+    mode = mode or RETRIEVAL_MODE
+    index_version = index_version or get_index_version()
+    lexical_index = None
+    if mode == "hybrid" and index_version:
+        lexical_index = BM25Index.load(get_index_dir(index_version))
+    if lexical_index is not None:
+        return HybridRetriever(vectorstore=vectordb, lexical_index=lexical_index, k=k)
+    return VectorStoreRetriever(vectorstore=vectordb, k=k)
+
+
+def get_qa_chain(vectordb, index_version: str = None):
+    """Creates and returns a LangChain Agent Executor (Tool-Enabled Agent).
+
+    Policy answers are cached semantically under ``index_version`` (default:
+    the current one), so near-duplicate questions skip the agent entirely.
+    """
+    index_version = index_version or get_index_version()
+    http_clients = {}
+    if OPENAI_HTTP_TRANSPORT is not None:
+        http_clients = {
+            "http_client": httpx.Client(transport=OPENAI_HTTP_TRANSPORT),
+            "http_async_client": httpx.AsyncClient(transport=OPENAI_ASYNC_HTTP_TRANSPORT),
+        }
     llm = ChatOpenAI(
         openai_api_key=OPENAI_API_KEY, 
+        base_url=OPENAI_BASE_URL,
         model_name=LLM_MODEL, 
-        temperature=0
+        temperature=0,
+        streaming=True,
+        # Token counts on streamed turns, for tracing
+        stream_usage=True,
+        **http_clients
     )
     
-    # 3.1 Define the RAG Retriever as a Tool
+    # 3.1 Define the RAG Retriever as a Tool (sync and async)
+    retriever = get_retriever(vectordb, index_version)
     retriever_tool = Tool(
         name="Policy_Document_Retriever",
-        func=vectordb.as_retriever(search_kwargs={"k": 3}).invoke,
+        func=retriever.invoke,
+        coroutine=retriever.ainvoke,
         description="Tool for searching and retrieving information from the official HR Policy Documents. USE THIS ONLY FOR GENERAL POLICY QUESTIONS (e.g., 'What is the WFH policy?').",
     )
     
-    # 3.2 Define the HRIS Tools and combine with the RAG Tool
-    hris_tools = [check_pto_balance, submit_leave_request]
+    # 3.2 Define the HRIS Tools (sync and async) and combine with the RAG Tool
+    hris_tools = [
+        StructuredTool.from_function(func=func, coroutine=HRIS_ASYNC_TOOL_MAP[name], name=name)
+        for name, func in HRIS_TOOL_MAP.items()
+    ]
     tools = hris_tools + [retriever_tool]
 
     # 3.3 Define the System Prompt
     system_message = (
         "You are the **HR Assistant Agent**. Your role is to provide quick, accurate, and confidential "
         "support to employees. Your primary goal is to determine the user's intent: \n\n"
-        "1. **Personalized Action (Tools):** If the user asks for their specific PTO, leave submission, or other personal data, **ALWAYS** use the appropriate HRIS tool (e.g., `check_pto_balance`). The default Employee ID for mock data is 'E1001'.\n"
+        f"1. **Personalized Action (Tools):** If the user asks for their specific PTO, leave submission, or other personal data, **ALWAYS** use the appropriate HRIS tool (e.g., `check_pto_balance`). The default Employee ID for mock data is '{DEFAULT_EMPLOYEE_ID}'.\n"
         "2. **General Policy (RAG):** If the user asks for general company rules, **ALWAYS** use the `Policy_Document_Retriever` tool.\n"
+        "3. **Team Questions (Tools):** For questions about a manager's team or several employees, call `check_team_pto_balances` ONCE (with the manager_id, or the list of employee_ids) instead of calling `check_pto_balance` per employee; use `get_team_roster` when only the team members are needed.\n"
         "Answer concisely and clearly. **Do not** generate output until the necessary tool steps are complete."
     )
     
@@ -146,18 +494,143 @@ def get_qa_chain(vectordb: Chroma):
         tools=tools, 
         verbose=True, 
         handle_parsing_errors=True,
-        max_iterations=15
+        max_iterations=15,
+        # Needed to tell policy-only answers (cacheable) from HRIS ones (never cached)
+        return_intermediate_steps=True
     )
     
+    # Per-stage spans (LLM turns, tools, retriever) of every traced query
+    tracing_handler = TracingCallbackHandler()
+    agent_config = {"callbacks": [tracing_handler]}
     print("--- 🔗 Agent Executor (Tool-Enabled QA Chain) ready ---")
     
     # 3.6 Return the executable function
+    def lookup_cached_answer(query: str):
+        """Returns (cached answer or None, query embedding or None if the query is personal)."""
+        # Personal questions never touch the semantic cache, in either direction
+        if is_personal_query(query):
+            return None, None
+        # Goes through the query-embedding LRU, so the retriever reuses it on a miss
+        with span("embedding.query"):
+            query_embedding = vectordb.embeddings.embed_query(query)
+        with span("answer_cache.lookup"):
+            return SEMANTIC_ANSWER_CACHE.lookup(query_embedding, index_version), query_embedding
+
+    async def alookup_cached_answer(query: str):
+        if is_personal_query(query):
+            return None, None
+        with span("embedding.query"):
+            query_embedding = await vectordb.embeddings.aembed_query(query)
+        with span("answer_cache.lookup"):
+            return SEMANTIC_ANSWER_CACHE.lookup(query_embedding, index_version), query_embedding
+
+    def remember_answer(query_embedding, output: dict):
+        tools_used = {action.tool for action, _ in output.get("intermediate_steps", [])}
+        if query_embedding is not None and tools_used == {retriever_tool.name}:
+            # Only answers grounded purely in policy documents are safe to share
+            SEMANTIC_ANSWER_CACHE.store(query_embedding, output['output'], index_version)
+
+    def answer_query(query: str):
+        # Simple HRIS lookups are answered straight from the tool, without any LLM call
+        with span("router"):
+            routed = INTENT_ROUTER.route(query, DEFAULT_EMPLOYEE_ID)
+        if routed is not None:
+            return {"result": routed["result"], "source_documents": [], "cached": False, "routed": routed["intent"]}
+
+        cached_answer, query_embedding = lookup_cached_answer(query)
+        if cached_answer is not None:
+            return {"result": cached_answer, "source_documents": [], "cached": True}
+
+        output = qa_agent_executor.invoke({"query": query}, config=agent_config)
+        remember_answer(query_embedding, output)
+
+        return {
+            "result": output['output'],
+            "source_documents": [],
+            "cached": False
+        }
+
     def execute_agent_query(query: str):
+        """Answers a query; the result includes its ``trace_id`` and per-stage ``timings_ms``."""
+        with trace_query(**{"query.chars": len(query)}) as trace:
+            result = answer_query(query)
+        return {**result, "trace_id": trace.trace_id, "timings_ms": trace.summary()}
+
+    def stream_answer(query: str):
+        with span("router"):
+            routed = INTENT_ROUTER.route(query, DEFAULT_EMPLOYEE_ID)
+        if routed is not None:
+            yield {"type": "token", "text": routed["result"]}
+            yield {"type": "final", "result": routed["result"], "source_documents": [], "cached": False,
+                   "routed": routed["intent"]}
+            return
+
+        cached_answer, query_embedding = lookup_cached_answer(query)
+        if cached_answer is not None:
+            yield {"type": "token", "text": cached_answer}
+            yield {"type": "final", "result": cached_answer, "source_documents": [], "cached": True}
+            return
+
+        for event in stream_executor(qa_agent_executor, {"query": query}, callbacks=[tracing_handler]):
+            if event["type"] != "output":
+                yield event
+                continue
+            output = event["output"]
+            remember_answer(query_embedding, output)
+            yield {"type": "final", "result": output['output'], "source_documents": [], "cached": False}
+
+    def stream_agent_query(query: str):
+        """Yields ``token`` and ``step`` events while the agent runs, then a ``final`` event.
+
+        The ``final`` event carries the same keys as ``execute_agent_query``'s result.
+        """
+        trace = Trace(**{"query.chars": len(query)})
+        # Every step runs in the trace's context: a generator may be resumed from different threads.
+        context = trace.context()
+        events = stream_answer(query)
+        try:
+            while True:
+                try:
+                    event = context.run(next, events)
+                except StopIteration:
+                    break
+                if event["type"] == "final":
+                    trace.finish()
+                    event = {**event, "trace_id": trace.trace_id, "timings_ms": trace.summary()}
+                yield event
+        except BaseException as e:
+            trace.finish(e)
+            raise
+        trace.finish()
+
+    async def aanswer_query(query: str):
+        with span("router"):
+            routed = await INTENT_ROUTER.aroute(query, DEFAULT_EMPLOYEE_ID)
+        if routed is not None:
+            return {"result": routed["result"], "source_documents": [], "cached": False, "routed": routed["intent"]}
+
+        cached_answer, query_embedding = await alookup_cached_answer(query)
+        if cached_answer is not None:
+            return {"result": cached_answer, "source_documents": [], "cached": True}
+
+        output = await qa_agent_executor.ainvoke({"query": query}, config=agent_config)
+        remember_answer(query_embedding, output)
+
         return {
-            "result": qa_agent_executor.invoke({"query": query})['output'],
-            "source_documents": [] 
+            "result": output['output'],
+            "source_documents": [],
+            "cached": False
         }
 
+    async def aexecute_agent_query(query: str):
+        """Async variant of ``execute_agent_query``: LLM, retriever and HRIS calls are all awaited."""
+        with trace_query(**{"query.chars": len(query)}) as trace:
+            result = await aanswer_query(query)
+        return {**result, "trace_id": trace.trace_id, "timings_ms": trace.summary()}
+
+    execute_agent_query.stream = stream_agent_query
+    execute_agent_query.ainvoke = aexecute_agent_query
+
     return execute_agent_query
 
 # --- 4. Example/Test Execution (Optional) ---
@@ -0,0 +1,179 @@
+# retrieval_benchmark.py
+#
+# Offline retrieval benchmark over a labeled question -> expected-passage set.
+# Run with:  python retrieval_benchmark.py --chunk-size 300 500 --k 3 5 --backend chroma numpy
+# Every combination of the given values is built and evaluated. The deterministic
+# local embedder is used by default; pass --embeddings openai to measure the real one.
+
+import argparse
+import difflib
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+DEFAULT_QA_PATH = "sample_policies/retrieval_qa.json"
+DEFAULT_DOCS = ["sample_policies/combined_hr_policy.pdf"]
+# Share of the expected passage a chunk must contain verbatim to count as relevant
+# (passages may straddle two chunks when chunks are small)
+MIN_PASSAGE_OVERLAP = 0.6
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def is_relevant(text: str, passage: str) -> bool:
+    """True if the chunk ``text`` contains (most of) the expected ``passage``."""
+    text, passage = _normalize(text), _normalize(passage)
+    if passage in text:
+        return True
+    match = difflib.SequenceMatcher(None, text, passage, autojunk=False).find_longest_match(0, len(text), 0, len(passage))
+    return match.size >= MIN_PASSAGE_OVERLAP * len(passage)
+
+
+def directory_size(path: str, names: tuple = None) -> int:
+    """Total bytes under ``path``, optionally only of top-level files named in ``names``."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            if names is None or (root == path and name in names):
+                total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def evaluate(retriever, qa: list, repeat: int, clear_cache) -> dict:
+    """Scores one retriever: recall@k and MRR from the first pass, latency over all passes."""
+    latencies = []
+    ranks = []
+    for attempt in range(repeat):
+        # Cold query-embedding cache, so every timing includes embedding the question
+        # (the persistent SQLite cache is bypassed by the caller, see bypass_persistent_cache)
+        clear_cache()
+        for item in qa:
+            started = time.perf_counter()
+            documents = retriever.invoke(item["question"])
+            latencies.append((time.perf_counter() - started) * 1000)
+            if attempt == 0:
+                relevant = [i for i, document in enumerate(documents) if is_relevant(document.page_content, item["passage"])]
+                ranks.append(relevant[0] + 1 if relevant else None)
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "recall_at_k": round(sum(rank is not None for rank in ranks) / len(ranks), 4),
+        "mrr": round(sum(1 / rank for rank in ranks if rank) / len(ranks), 4),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+    }
+
+
+def bypass_persistent_cache(vectordb):
+    """Sends the store's query embeddings past the SQLite embedding cache.
+
+    Otherwise every pass after the first reads the vectors from disk and the
+    timings leave out the embedding round trip.
+    """
+    from embedding_cache import CachedEmbeddings
+
+    query_embedder = vectordb.embeddings
+    if isinstance(query_embedder.embedder, CachedEmbeddings):
+        query_embedder.embedder = query_embedder.embedder.embedder
+
+
+def run(args) -> list:
+    """Builds an index per chunking/quantization setting and evaluates every retriever config on it."""
+    with open(args.qa, "r", encoding="utf-8") as f:
+        qa = json.load(f)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="retrieval-benchmark-")
+    # rag_backend reads its configuration at import time.
+    os.environ["CHROMA_PATH"] = os.path.join(workdir, "db")
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(workdir, "embedding_cache.sqlite3")
+    os.environ["EMBEDDING_PROVIDER"] = "hashing" if args.embeddings == "hashing" else "openai"
+    # Always export the NumPy index too, so both backends can be evaluated on one build
+    os.environ["VECTOR_BACKEND"] = "numpy"
+    import rag_backend
+    from numpy_store import EMBEDDINGS_FILE, METADATA_FILE, INT8_CODES_FILE, INT8_SCALES_FILE, BINARY_CODES_FILE
+
+    results = []
+    try:
+        for chunk_size, chunk_overlap, quantization in itertools.product(args.chunk_size, args.chunk_overlap, args.quantization):
+            if chunk_overlap >= chunk_size:
+                continue
+            started = time.perf_counter()
+            db = rag_backend.build_vector_db(
+                args.docs, quantization=quantization, chunk_size=chunk_size, chunk_overlap=chunk_overlap
+            )
+            build_seconds = time.perf_counter() - started
+            if db is None:
+                raise RuntimeError(f"No documents could be indexed from {args.docs}.")
+            index_dir = rag_backend.get_index_dir()
+            build = {
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+                "quantization": quantization,
+                "chunks": len(db.get()["ids"]),
+                "build_s": round(build_seconds, 3),
+                "index_mb": round(directory_size(index_dir) / 1e6, 3),
+                "numpy_mb": round(directory_size(index_dir, (
+                    EMBEDDINGS_FILE, METADATA_FILE, INT8_CODES_FILE, INT8_SCALES_FILE, BINARY_CODES_FILE
+                )) / 1e6, 3),
+            }
+
+            for backend in args.backend:
+                if backend == "chroma" and quantization != "none":
+                    # Quantization only applies to the NumPy index
+                    continue
+                vectordb = rag_backend.load_vector_db(backend)
+                bypass_persistent_cache(vectordb)
+                for mode, k in itertools.product(args.mode, args.k):
+                    retriever = rag_backend.get_retriever(vectordb, k=k, mode=mode)
+                    metrics = evaluate(retriever, qa, args.repeat, rag_backend.QUERY_EMBEDDING_CACHE.clear)
+                    results.append({**build, "backend": backend, "mode": mode, "k": k, **metrics})
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def print_table(results: list):
+    columns = [
+        "chunk_size", "chunk_overlap", "quantization", "backend", "mode", "k", "chunks",
+        "recall_at_k", "mrr", "p50_ms", "p95_ms", "p99_ms", "build_s", "index_mb", "numpy_mb",
+    ]
+    widths = {column: max(len(column), *(len(str(row[column])) for row in results)) for column in columns}
+    print("  ".join(column.rjust(widths[column]) for column in columns))
+    for row in results:
+        print("  ".join(str(row[column]).rjust(widths[column]) for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark policy retrieval quality, latency and index cost.")
+    parser.add_argument("--qa", default=DEFAULT_QA_PATH, help="JSON list of {question, passage} items")
+    parser.add_argument("--docs", nargs="+", default=DEFAULT_DOCS, help="Policy documents to index")
+    parser.add_argument("--chunk-size", nargs="+", type=int, default=[500])
+    parser.add_argument("--chunk-overlap", nargs="+", type=int, default=[100])
+    parser.add_argument("--k", nargs="+", type=int, default=[3])
+    parser.add_argument("--backend", nargs="+", choices=["chroma", "numpy"], default=["chroma"])
+    parser.add_argument("--mode", nargs="+", choices=["hybrid", "vector"], default=["hybrid"])
+    parser.add_argument("--quantization", nargs="+", choices=["none", "int8", "binary"], default=["none"])
+    parser.add_argument("--embeddings", choices=["hashing", "openai"], default="hashing")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes over the QA set per config")
+    parser.add_argument("--workdir", help="Keep the built indexes here instead of a temporary directory")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args)
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
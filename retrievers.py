@@ -0,0 +1,107 @@
+# retrievers.py
+
+import asyncio
+from typing import Any
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+
+from query_tracing import span
+
+
+def _stable(documents: list) -> list:
+    """Sorts each document's metadata keys so identical results always render (and prompt) identically."""
+    for document in documents:
+        document.metadata = dict(sorted(document.metadata.items()))
+    return documents
+
+
+class VectorStoreRetriever(BaseRetriever):
+    """Dense similarity retriever whose async path never blocks the event loop.
+
+    The query is embedded with the embedder's native async API; only the local
+    vector search itself runs in a worker thread.
+    """
+
+    vectorstore: VectorStore
+    k: int = 3
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list:
+        # Embedding and search are split (as similarity_search does internally) so each gets its own span
+        with span("embedding.query", run_manager.run_id):
+            embedding = self.vectorstore.embeddings.embed_query(query)
+        with span("vector_search", run_manager.run_id, k=self.k):
+            return _stable(self.vectorstore.similarity_search_by_vector(embedding, k=self.k))
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> list:
+        with span("embedding.query", run_manager.run_id):
+            embedding = await self.vectorstore.embeddings.aembed_query(query)
+        with span("vector_search", run_manager.run_id, k=self.k):
+            return _stable(await asyncio.to_thread(self.vectorstore.similarity_search_by_vector, embedding, k=self.k))
+
+
+def _fusion_key(document) -> tuple:
+    return (document.metadata.get("source"), document.metadata.get("page"), document.page_content)
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuses BM25 and dense vector rankings with reciprocal rank fusion (RRF).
+
+    Exact-term queries (policy codes, form numbers, acronyms) are caught by the
+    lexical ranking, paraphrases by the dense one. If the vector search fails
+    (e.g. the embedding API is unavailable) results come from BM25 alone. The
+    async path runs both local searches in worker threads.
+    """
+
+    vectorstore: VectorStore
+    lexical_index: Any
+    k: int = 3
+    fetch_k: int = 12
+    rrf_k: int = 60
+
+    def _lexical_documents(self, query: str, run_id) -> list:
+        with span("lexical_search", run_id, k=self.fetch_k):
+            hits = self.lexical_index.search(query, self.fetch_k)
+        return [self.lexical_index.get_document(chunk_id) for chunk_id, _ in hits]
+
+    async def _alexical_documents(self, query: str, run_id) -> list:
+        # BM25 scoring is pure Python; in a worker thread it doesn't stall other in-flight queries
+        with span("lexical_search", run_id, k=self.fetch_k):
+            hits = await asyncio.to_thread(self.lexical_index.search, query, self.fetch_k)
+        return [self.lexical_index.get_document(chunk_id) for chunk_id, _ in hits]
+
+    def _fuse(self, rankings: list) -> list:
+        scores = {}
+        documents = {}
+        for ranking in rankings:
+            for rank, document in enumerate(ranking):
+                key = _fusion_key(document)
+                documents.setdefault(key, document)
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        best = sorted(scores, key=scores.get, reverse=True)[:self.k]
+        return _stable([documents[key] for key in best])
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list:
+        lexical = self._lexical_documents(query, run_manager.run_id)
+        try:
+            with span("embedding.query", run_manager.run_id):
+                embedding = self.vectorstore.embeddings.embed_query(query)
+            with span("vector_search", run_manager.run_id, k=self.fetch_k):
+                dense = self.vectorstore.similarity_search_by_vector(embedding, k=self.fetch_k)
+        except Exception as e:
+            print(f"Vector search unavailable, using lexical results only: {e}")
+            dense = []
+        return self._fuse([dense, lexical])
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> list:
+        lexical = await self._alexical_documents(query, run_manager.run_id)
+        try:
+            with span("embedding.query", run_manager.run_id):
+                embedding = await self.vectorstore.embeddings.aembed_query(query)
+            with span("vector_search", run_manager.run_id, k=self.fetch_k):
+                dense = await asyncio.to_thread(self.vectorstore.similarity_search_by_vector, embedding, k=self.fetch_k)
+        except Exception as e:
+            print(f"Vector search unavailable, using lexical results only: {e}")
+            dense = []
+        return self._fuse([dense, lexical])